@@ -0,0 +1,111 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .caching import bump_class_versions
+from .models import ArchivedAssignment, ArchivedSubmission, Assignment, Submission, Tombstone
+
+ASSIGNMENT_FIELDS = ('id', 'subject', 'title', 'description', 'due', 'status', 'created_by_id', 'classroom_id', 'created_at')
+SUBMISSION_FIELDS = ('id', 'assignment_id', 'student_id', 'file', 'submitted_at', 'status', 'score')
+
+LATEST_ARCHIVED_YEAR_KEY = 'latest_archived_year'
+
+
+def academic_year_for(moment):
+    """Academic years are labelled by the calendar year they start in."""
+    return moment.year if moment.month >= settings.ACADEMIC_YEAR_START_MONTH else moment.year - 1
+
+
+def current_academic_year():
+    return academic_year_for(timezone.localdate())
+
+
+def academic_year_start(year):
+    return datetime.date(year, settings.ACADEMIC_YEAR_START_MONTH, 1)
+
+
+def academic_year_bounds(year):
+    return academic_year_start(year), academic_year_start(year + 1)
+
+
+def archivable_assignments(year):
+    start, end = academic_year_bounds(year)
+    return Assignment.objects.filter(created_at__gte=start, created_at__lt=end, due__lt=timezone.now())
+
+
+def is_archived(year):
+    return ArchivedAssignment.objects.filter(academic_year=year).exists()
+
+
+def latest_archived_year():
+    """Most recent archived academic year, or None. Cached until archive_year() runs again."""
+    latest = cache.get(LATEST_ARCHIVED_YEAR_KEY)
+    if latest is None:
+        latest = ArchivedAssignment.objects.aggregate(latest=Max('academic_year'))['latest'] or 0
+        cache.set(LATEST_ARCHIVED_YEAR_KEY, latest, timeout=None)
+    return latest or None
+
+
+def live_listing_filter(prefix=''):
+    """Q selecting the live assignments listed by default (``prefix`` reaches them through a relation).
+
+    Years are only dropped from the listing once they have been archived, and
+    anything still open stays listed whatever year it was set in.
+    """
+    latest = latest_archived_year()
+    if latest is None:
+        return Q()
+    return Q(**{f'{prefix}created_at__gte': academic_year_start(latest + 1)}) | Q(**{f'{prefix}due__gte': timezone.now()})
+
+
+def archive_year(year, batch_size=1000):
+    """Copy one closed year's assignments and submissions to the archive tables, then delete them.
+
+    Works in id-ordered batches, each in its own transaction, so hot tables are never
+    locked for long and an interrupted run can simply be restarted. Assignments that
+    are still open stay live so students can submit; run again once they close.
+    """
+    from .sync import tombstones_suppressed  # academics.sync imports this module
+
+    moved_assignments = moved_submissions = 0
+    while True:
+        with transaction.atomic():
+            assignments = list(
+                archivable_assignments(year)
+                .order_by('id').values(*ASSIGNMENT_FIELDS)[:batch_size]
+            )
+            if not assignments:
+                break
+            ids = [row['id'] for row in assignments]
+            authors = {row['id']: row['created_by_id'] for row in assignments}
+            submissions = list(Submission.objects.filter(assignment_id__in=ids).values(*SUBMISSION_FIELDS))
+            ArchivedAssignment.objects.bulk_create(
+                [ArchivedAssignment(academic_year=year, **row) for row in assignments], ignore_conflicts=True
+            )
+            ArchivedSubmission.objects.bulk_create(
+                [ArchivedSubmission(academic_year=year, **row) for row in submissions], ignore_conflicts=True
+            )
+            # Archived rows leave the current-year listings, so sync clients get tombstones
+            # for them, written here in bulk rather than one by one from the signals.
+            with tombstones_suppressed():
+                Submission.objects.filter(assignment_id__in=ids).delete()
+                Assignment.objects.filter(id__in=ids).delete()
+            Tombstone.objects.bulk_create(
+                [Tombstone(model='assignments', object_id=row['id'], school_class_id=row['classroom_id'],
+                           user_id=row['created_by_id']) for row in assignments]
+                + [Tombstone(model='submissions', object_id=row['id'], user_id=row['student_id'],
+                             parent_id=row['assignment_id'], author_id=authors[row['assignment_id']])
+                   for row in submissions]
+            )
+            # Once committed, the cached listings of these classes must drop the moved rows.
+            # The per-row signals skip their own bumps while tombstones are suppressed.
+            class_ids = {row['classroom_id'] for row in assignments} - {None}
+            transaction.on_commit(lambda class_ids=class_ids: bump_class_versions(*class_ids))
+            transaction.on_commit(lambda: cache.delete(LATEST_ARCHIVED_YEAR_KEY))
+        moved_assignments += len(assignments)
+        moved_submissions += len(submissions)
+    return moved_assignments, moved_submissions
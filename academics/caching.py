@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Payload builders by name. Entries refreshed in the background are rebuilt by the
+# refresh_cached_payload Celery task, so their args must be JSON-serialisable.
+_builders = {}
+
+
+def _class_version_keys(class_ids):
+    return [f'class_version_{class_id}' for class_id in class_ids]
+
+
+def bump_class_versions(*class_ids):
+    # Any change to a class's assignments or submissions moves its version on,
+    # which retires every cached payload keyed to that class.
+    for key in _class_version_keys(class_ids):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def classes_fingerprint(class_ids):
+    """Digest of the classes and their current versions, read with one get_many."""
+    class_ids = sorted(class_ids)
+    versions = cache.get_many(_class_version_keys(class_ids))
+    fingerprint = ','.join(
+        f"{class_id}:{versions.get(key, 0)}" for class_id, key in zip(class_ids, _class_version_keys(class_ids))
+    )
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def classes_cache_key(prefix, class_ids):
+    return f"{prefix}_{classes_fingerprint(class_ids)}"
+
+
+def cache_builder(name):
+    def register(func):
+        _builders[name] = func
+        return func
+    return register
+
+
+def _lock_key(key):
+    return f'{key}:rebuild'
+
+
+def release(key):
+    cache.delete(_lock_key(key))
+
+
+def store(key, value, timeout, build_time):
+    # Entries outlive their freshness by CACHE_STALE_SECONDS so there is something
+    # to serve while a single worker rebuilds them.
+    envelope = {'value': value, 'expires': time.time() + timeout, 'delta': build_time}
+    cache.set(key, envelope, timeout=timeout + settings.CACHE_STALE_SECONDS)
+
+
+def rebuild(name, args, key, timeout):
+    started = time.perf_counter()
+    value = _builders[name](*args)
+    if value is not None:
+        store(key, value, timeout, time.perf_counter() - started)
+    return value
+
+
+def _envelope(cached):
+    # Entries written before envelopes were introduced are bare payloads under the
+    # same keys; treat them as misses rather than trusting their shape.
+    if isinstance(cached, dict) and cached.keys() == {'value', 'expires', 'delta'}:
+        return cached
+    return None
+
+
+def _is_fresh(envelope):
+    # Probabilistic early expiry (XFetch): the closer to expiry and the slower the
+    # build, the likelier one reader volunteers to refresh ahead of everyone else.
+    jitter = envelope['delta'] * settings.CACHE_EARLY_EXPIRY_BETA * -math.log(1.0 - random.random())
+    return time.time() + jitter < envelope['expires']
+
+
+def _resolve(name, args, key, timeout, envelope, background):
+    envelope = _envelope(envelope)
+    if envelope is not None and _is_fresh(envelope):
+        return envelope['value']
+
+    if cache.add(_lock_key(key), 1, timeout=settings.CACHE_REBUILD_LOCK_SECONDS):
+        if envelope is not None and background:
+            from .tasks import refresh_cached_payload
+            try:
+                refresh_cached_payload.delay(name, list(args), key, timeout)
+            except Exception as e:
+                # The broker is down: let the next reader try again rather than holding
+                # the lock for nobody, and keep serving what we have.
+                logger.error(f"Could not queue a rebuild of {key}: {e}")
+                release(key)
+            return envelope['value']
+        try:
+            return rebuild(name, args, key, timeout)
+        finally:
+            release(key)
+
+    if envelope is not None:
+        return envelope['value']  # Someone else is rebuilding; stale is good enough.
+
+    # Cold miss while another worker builds: wait briefly for its result before
+    # falling back to building (and storing) it ourselves.
+    deadline = time.monotonic() + settings.CACHE_REBUILD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        envelope = _envelope(cache.get(key))
+        if envelope is not None:
+            return envelope['value']
+    return rebuild(name, args, key, timeout)
+
+
+def get_or_build(name, *args, key, timeout, background=False):
+    """Cached value for ``key``, rebuilt by the registered builder ``name`` with single-flight locking.
+
+    Expired entries are served stale while one caller (or, with ``background``, a
+    Celery task) rebuilds them.
+    """
+    return _resolve(name, args, key, timeout, cache.get(key), background)
+
+
+def get_many_or_build(specs):
+    """Like get_or_build for several entries, fetched with a single get_many.
+
+    ``specs`` maps each key to ``(builder name, args, timeout, background)``.
+    """
+    envelopes = cache.get_many(list(specs))
+    return {
+        key: _resolve(name, args, key, timeout, envelopes.get(key), background)
+        for key, (name, args, timeout, background) in specs.items()
+    }
@@ -0,0 +1,103 @@
+import csv
+import tempfile
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .models import Submission
+
+HEADER = ('Student', 'Email', 'Class', 'Subject', 'Assignment', 'Due', 'Status', 'Score', 'Submitted at')
+COLUMNS = (
+    'student__first_name', 'student__last_name', 'student__email', 'assignment__classroom__name',
+    'assignment__subject', 'assignment__title', 'assignment__due', 'status', 'score', 'submitted_at',
+)
+
+CSV_CONTENT_TYPE = 'text/csv'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Spreadsheet apps read a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def grade_rows(submissions=None):
+    """Export rows for ``submissions`` (all by default), read through a server-side cursor."""
+    submissions = Submission.objects.all() if submissions is None else submissions
+    rows = (
+        submissions.order_by('assignment__classroom__name', 'assignment__subject', 'assignment_id', 'student__last_name')
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+    for first_name, last_name, email, class_name, subject, title, due, status, score, submitted_at in rows:
+        yield (
+            f"{first_name} {last_name}", email, class_name or '', subject, title,
+            due.isoformat(), status, '' if score is None else score, submitted_at.isoformat(),
+        )
+
+
+def _looks_like_formula(value):
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+
+def _escape(row):
+    # Names and titles are user input. CSV has no cell types, so a leading quote is
+    # the only way to make a spreadsheet read them as plain text.
+    return [f"'{value}" if _looks_like_formula(value) else value for value in row]
+
+
+class _Echo:
+    # csv.writer wants a file; this one hands each formatted line straight back.
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(_escape(row))
+
+
+def xlsx_stream(rows):
+    # A workbook is a zip that can only be finished at the end, so write-only mode
+    # spools rows to a temporary file, which is then streamed back in blocks.
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    def text_cell(value):
+        # XLSX cells are typed: store it as a string rather than a formula, and set
+        # quotePrefix so Excel keeps it as text if the cell is edited. No stray quote.
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        cell.quotePrefix = True
+        return cell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Grades')
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append([text_cell(value) if _looks_like_formula(value) else value for value in row])
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while block := spool.read(64 * 1024):
+            yield block
+
+
+def export_response(submissions=None, file_format='csv', filename='grades'):
+    """StreamingHttpResponse with the grades of ``submissions`` as CSV or XLSX.
+
+    Raises ValueError for an unknown format, or for XLSX when openpyxl is not installed.
+    """
+    if file_format == 'csv':
+        stream, content_type = csv_stream(grade_rows(submissions)), CSV_CONTENT_TYPE
+    elif file_format == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ValueError("XLSX export needs openpyxl installed")
+        stream, content_type = xlsx_stream(grade_rows(submissions)), XLSX_CONTENT_TYPE
+    else:
+        raise ValueError("Format must be csv or xlsx")
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
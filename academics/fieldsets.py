@@ -0,0 +1,72 @@
+# Sparse fieldsets for the list endpoints. Each spec maps an output field to the
+# columns it needs and how to read it, so a narrowed request also narrows the SELECT.
+
+EVENT_FIELDS = {
+    'id': ((), lambda occurrence: occurrence[0].id),
+    'title': (('title',), lambda occurrence: occurrence[0].title),
+    'description': (('description',), lambda occurrence: occurrence[0].description),
+    'start': ((), lambda occurrence: occurrence[1].isoformat()),
+    'end': ((), lambda occurrence: occurrence[2].isoformat()),
+    'school_class': (
+        ('school_class__name',),
+        lambda occurrence: occurrence[0].school_class.name if occurrence[0].school_class else None,
+    ),
+    'allDay': (('allDay',), lambda occurrence: occurrence[0].allDay),
+    'recurring': ((), lambda occurrence: bool(occurrence[0].recurrence)),
+}
+# Always loaded: expanding a series into occurrences reads them.
+EVENT_COLUMNS = ('start', 'end', 'recurrence', 'recurrence_exceptions')
+
+ANNOUNCEMENT_FIELDS = {
+    'id': ((), lambda announcement: announcement.id),
+    'title': (('title',), lambda announcement: announcement.title),
+    'description': (('description',), lambda announcement: announcement.description),
+    'date': (('date',), lambda announcement: announcement.date.isoformat()),
+    'target_role': (('target_role',), lambda announcement: announcement.target_role),
+    'school_class': (('school_class',), lambda announcement: announcement.school_class_id),
+}
+
+ASSIGNMENT_FIELDS = {
+    'id': ((), lambda assignment: assignment.id),
+    'subject': (('subject',), lambda assignment: assignment.subject),
+    'title': (('title',), lambda assignment: assignment.title),
+    'description': (('description',), lambda assignment: assignment.description),
+    'due': (('due',), lambda assignment: assignment.due.isoformat()),
+    'status': (('status',), lambda assignment: assignment.status),
+    'classroom': (('classroom',), lambda assignment: assignment.classroom_id),
+    'created_at': (('created_at',), lambda assignment: assignment.created_at.isoformat()),
+}
+# Only in student listings; come from the prefetched submission rather than a column.
+SUBMISSION_STATUS_FIELDS = ('submission_status', 'submission_score')
+
+
+def parse_fields(value, available):
+    """Sorted field names requested by a ``fields=title,due`` parameter, or None for all of them.
+
+    ``id`` is always included. Raises ValueError on unknown names.
+    """
+    if not value:
+        return None
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - set(available)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return sorted(fields | {'id'})
+
+
+def wants(fields, name):
+    return fields is None or name in fields
+
+
+def columns(spec, fields, always=()):
+    """Column names for ``only()`` covering the requested fields."""
+    selected = {column for name, (needed, _) in spec.items() if wants(fields, name) for column in needed}
+    return ['id', *sorted(selected | set(always))]
+
+
+def serialize(spec, obj, fields):
+    return {name: read(obj) for name, (_, read) in spec.items() if wants(fields, name)}
+
+
+def fields_key(fields):
+    return '' if fields is None else '_fields_' + '.'.join(fields)
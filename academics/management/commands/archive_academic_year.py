@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.archive import archivable_assignments, archive_year, current_academic_year
+from academics.models import Submission
+
+
+class Command(BaseCommand):
+    help = "Move a closed academic year's assignments and submissions into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help="Academic year to archive, labelled by its starting calendar year")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Count what would move without moving it")
+
+    def handle(self, *args, **options):
+        year = options['year']
+        if year >= current_academic_year():
+            raise CommandError(f"{year} is not a closed academic year")
+
+        if options['dry_run']:
+            assignments = archivable_assignments(year)
+            submissions = Submission.objects.filter(assignment__in=assignments)
+            self.stdout.write(f"Would archive {assignments.count()} assignments and {submissions.count()} submissions from {year}")
+            return
+
+        moved_assignments, moved_submissions = archive_year(year, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved_assignments} assignments and {moved_submissions} submissions from {year}"
+        ))
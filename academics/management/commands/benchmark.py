@@ -0,0 +1,353 @@
+import datetime
+import itertools
+import json
+import random
+import statistics
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from academics.models import (
+    Announcement, Assignment, Event, Grade, SchoolClass, SubjectChoices, Submission, TeacherSubject,
+)
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'bench-password'
+
+# (name, role, path, extra query parameter)
+ENDPOINTS = [
+    ('home[student]', 'student', '/api/home', None),
+    ('home[teacher]', 'teacher', '/api/home', None),
+    ('calendar_events', 'student', '/api/calendar-events', None),
+    ('announcements', 'student', '/api/announcements', None),
+    ('announcements_unread', 'student', '/api/announcements/unread-count', None),
+    ('assignment_view[student]', 'student', '/api/assignments', None),
+    ('assignment_view[teacher]', 'teacher', '/api/assignments', None),
+    ('assignment_submissions', 'teacher', '/api/assignments/submissions', 'assignment_id'),
+    ('assignment_dashboard', 'teacher', '/api/assignments/dashboard', None),
+    ('classes_view', 'teacher', '/api/classes', None),
+    ('sync[full]', 'student', '/api/sync', None),
+    ('sync[incremental]', 'student', '/api/sync', 'cursor'),
+    ('grade_export', 'teacher', '/api/assignments/export', None),
+]
+
+# Lookups the caching layer makes to decide which payload to read (class versions,
+# replica pins, the archived year). Their hit rate says nothing about payload caching.
+BOOKKEEPING_KEY_PREFIXES = ('class_version_', 'db_pin_', 'latest_archived_year')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def new_cache_stats():
+    return {'hits': 0, 'misses': 0, 'bookkeeping_hits': 0, 'bookkeeping_misses': 0}
+
+
+@contextmanager
+def capture_queries():
+    # Reads may be routed to a replica, so every alias is captured, not just the primary.
+    with ExitStack() as stack:
+        yield {alias: stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections}
+
+
+@contextmanager
+def count_cache_hits(stats):
+    # Wraps the default cache's read methods for the duration of a measured request.
+    backend = caches['default']
+    original_get, original_get_many = backend.get, backend.get_many
+
+    def record(key, hit):
+        prefix = 'bookkeeping_' if key.startswith(BOOKKEEPING_KEY_PREFIXES) else ''
+        stats[prefix + ('hits' if hit else 'misses')] += 1
+
+    def get(key, default=None, version=None):
+        value = original_get(key, default=default, version=version)
+        record(key, value is not default)
+        return value
+
+    def get_many(keys, version=None):
+        keys = list(keys)
+        values = original_get_many(keys, version=version)
+        for key in keys:
+            record(key, key in values)
+        return values
+
+    backend.get, backend.get_many = get, get_many
+    try:
+        yield stats
+    finally:
+        del backend.get, backend.get_many
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic school into a throwaway database and benchmark the API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grades', type=int, default=4)
+        parser.add_argument('--classes-per-grade', type=int, default=4)
+        parser.add_argument('--students-per-class', type=int, default=40)
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--assignments-per-class', type=int, default=20)
+        parser.add_argument('--submission-rate', type=float, default=0.7)
+        parser.add_argument('--events', type=int, default=300)
+        parser.add_argument('--announcements', type=int, default=200)
+        parser.add_argument('--sample-users', type=int, default=5, help="Logged-in users per role")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--output', help="Write results as JSON to this path")
+        parser.add_argument('--compare', help="Compare against a previous JSON result")
+        parser.add_argument('--threshold', type=float, default=10.0, help="Allowed p95 regression in percent")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse and keep the benchmark database")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        # Every class needs a teacher, and without samples the percentiles and means divide by zero.
+        for name in ('teachers', 'iterations', 'sample_users'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        random.seed(options['seed'])
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        for alias in settings.REPLICA_DATABASES:
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        cache_settings = {alias: dict(conf, KEY_PREFIX=f"bench-{uuid.uuid4().hex[:8]}") for alias, conf in settings.CACHES.items()}
+        try:
+            with override_settings(
+                CACHES=cache_settings,
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                DEBUG=False,
+            ):
+                if not (options['keepdb'] and Grade.objects.exists()):
+                    started = time.perf_counter()
+                    self.seed(options)
+                    self.stdout.write(f"Seeded dataset in {time.perf_counter() - started:.1f}s")
+                results = self.run(options)
+        finally:
+            if not options['keepdb']:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    def seed(self, options):
+        now = timezone.now()
+        password = make_password(BENCH_PASSWORD)
+        subjects = [choice for choice, _ in SubjectChoices.choices]
+
+        grades = Grade.objects.bulk_create([Grade(level=level) for level in range(1, options['grades'] + 1)])
+        classes = SchoolClass.objects.bulk_create([
+            SchoolClass(name=f"{grade.level}{chr(65 + index)}", capacity=options['students_per_class'], grade=grade)
+            for grade in grades for index in range(options['classes_per_grade'])
+        ])
+        teachers = User.objects.bulk_create([
+            User(email=f"teacher{i}@bench.local", role='teacher', first_name='Teacher', last_name=str(i),
+                 password=password, is_active=True)
+            for i in range(options['teachers'])
+        ])
+        TeacherSubject.objects.bulk_create([
+            TeacherSubject(teacher=teacher, subject=subject)
+            for teacher in teachers for subject in random.sample(subjects, 2)
+        ])
+        students = User.objects.bulk_create([
+            User(email=f"student{cls.id}_{i}@bench.local", role='student', first_name='Student', last_name=str(i),
+                 password=password, is_active=True, school_class=cls)
+            for cls in classes for i in range(options['students_per_class'])
+        ])
+
+        teacher_links, class_teachers = [], {}
+        for cls in classes:
+            class_teachers[cls.id] = random.sample(teachers, min(3, len(teachers)))
+            teacher_links += [
+                SchoolClass.teachers.through(schoolclass_id=cls.id, user_id=teacher.id)
+                for teacher in class_teachers[cls.id]
+            ]
+        SchoolClass.teachers.through.objects.bulk_create(teacher_links, batch_size=5000)
+        SchoolClass.students.through.objects.bulk_create([
+            SchoolClass.students.through(schoolclass_id=student.school_class_id, user_id=student.id)
+            for student in students
+        ], batch_size=5000)
+
+        assignments = Assignment.objects.bulk_create([
+            Assignment(
+                title=f"Assignment {cls.name}-{i}", description="Lorem ipsum " * 40,
+                subject=random.choice(subjects), classroom=cls, created_by=random.choice(class_teachers[cls.id]),
+                due=now + datetime.timedelta(hours=random.randint(-24 * 30, 24 * 30)),
+            )
+            for cls in classes for i in range(options['assignments_per_class'])
+        ], batch_size=5000)
+
+        students_by_class = {}
+        for student in students:
+            students_by_class.setdefault(student.school_class_id, []).append(student)
+        Submission.objects.bulk_create([
+            Submission(
+                assignment=assignment, student=student, file=f"bench/{assignment.id}_{student.id}.pdf",
+                status=random.choice(['submitted', 'graded']), score=random.randint(0, 100),
+            )
+            for assignment in assignments for student in students_by_class.get(assignment.classroom_id, ())
+            if random.random() < options['submission_rate']
+        ], batch_size=5000)
+
+        Event.objects.bulk_create([
+            Event(
+                title=f"Event {i}", description="Lorem ipsum " * 20,
+                start=now + datetime.timedelta(days=random.randint(-60, 60)),
+                end=now + datetime.timedelta(days=random.randint(61, 62)),
+                school_class=random.choice(classes + [None]),
+            )
+            for i in range(options['events'])
+        ], batch_size=5000)
+        Announcement.objects.bulk_create([
+            Announcement(
+                title=f"Announcement {i}", description="Lorem ipsum " * 30,
+                target_role=random.choice(['both', 'teacher', 'student']), school_class=random.choice(classes + [None]),
+            )
+            for i in range(options['announcements'])
+        ], batch_size=5000)
+
+    def login(self, client, user, address):
+        # Goes through the real login and OTP routes; the OTP is read back from the cache.
+        response = client.post('/api/auth/login', {'email': user.email, 'password': BENCH_PASSWORD},
+                               content_type='application/json', REMOTE_ADDR=address)
+        if response.status_code != 200:
+            raise CommandError(f"Login failed for {user.email}: {response.status_code} {response.content[:200]}")
+        otp = caches['default'].get(f'otp_{user.id}')
+        response = client.post('/api/auth/verify-otp', {'token': response.json()['token'], 'otp': otp},
+                               content_type='application/json', REMOTE_ADDR=address)
+        if response.status_code != 200:
+            raise CommandError(f"OTP verification failed for {user.email}: {response.status_code}")
+        return f"Bearer {response.json()['token']}"
+
+    def run(self, options):
+        client = Client()
+        sessions = {}
+        # Every login comes from its own address so the per-IP auth limits never trip.
+        addresses = (f"10.0.{index // 250}.{index % 250 + 1}" for index in itertools.count())
+        for role in ('teacher', 'student'):
+            users = User.objects.filter(role=role, is_active=True).order_by('?')[:options['sample_users']]
+            sessions[role] = [(user, self.login(client, user, next(addresses))) for user in users]
+            if not sessions[role]:
+                raise CommandError(f"No active {role}s to benchmark with; seed some or drop --keepdb")
+        owned_assignments = {
+            user.id: list(Assignment.objects.filter(created_by=user).values_list('id', flat=True))
+            for user, _ in sessions['teacher']
+        }
+        # Incremental syncs resume from a cursor taken once, up front, so each one
+        # covers the same window rather than an ever-shrinking one.
+        sync_cursors = {
+            user.id: client.get('/api/sync', HTTP_AUTHORIZATION=token).json()['cursor']
+            for user, token in sessions['student']
+        }
+
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'scale': {key: options[key] for key in (
+                    'grades', 'classes_per_grade', 'students_per_class', 'teachers',
+                    'assignments_per_class', 'submission_rate', 'events', 'announcements',
+                )},
+            },
+            'endpoints': {},
+        }
+        for name, role, path, param in ENDPOINTS:
+            latencies, query_counts, statuses = [], [], {}
+            alias_queries = dict.fromkeys(connections, 0)
+            cache_stats = new_cache_stats()
+            started = time.perf_counter()
+            for iteration in range(options['warmup'] + options['iterations']):
+                user, token = sessions[role][iteration % len(sessions[role])]
+                params = {}
+                if param == 'assignment_id' and owned_assignments[user.id]:
+                    params['assignment_id'] = random.choice(owned_assignments[user.id])
+                elif param == 'cursor':
+                    params['cursor'] = sync_cursors[user.id]
+                measured = iteration >= options['warmup']
+                if measured and iteration == options['warmup']:
+                    started = time.perf_counter()
+                stats = cache_stats if measured else new_cache_stats()
+                with capture_queries() as queries, count_cache_hits(stats):
+                    request_started = time.perf_counter()
+                    response = client.get(path, params, HTTP_AUTHORIZATION=token)
+                    if response.streaming:
+                        # Exports are built while they stream, so drain the body to time them.
+                        for _ in response.streaming_content:
+                            pass
+                    elapsed = time.perf_counter() - request_started
+                if measured:
+                    latencies.append(elapsed * 1000)
+                    query_counts.append(sum(len(captured) for captured in queries.values()))
+                    for alias, captured in queries.items():
+                        alias_queries[alias] += len(captured)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            total = time.perf_counter() - started
+            lookups = cache_stats['hits'] + cache_stats['misses']
+            bookkeeping = cache_stats['bookkeeping_hits'] + cache_stats['bookkeeping_misses']
+            results['endpoints'][name] = {
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'mean_ms': round(statistics.fmean(latencies), 3),
+                'throughput_rps': round(len(latencies) / total, 1) if total else None,
+                'queries_per_request': round(statistics.fmean(query_counts), 2),
+                'max_queries': max(query_counts),
+                'queries_per_alias': {
+                    alias: round(count / len(latencies), 2) for alias, count in alias_queries.items() if count
+                },
+                'cache_hit_rate': round(cache_stats['hits'] / lookups, 3) if lookups else None,
+                'bookkeeping_lookups_per_request': round(bookkeeping / len(latencies), 2),
+                'bookkeeping_hit_rate': round(cache_stats['bookkeeping_hits'] / bookkeeping, 3) if bookkeeping else None,
+                'status_codes': {str(code): count for code, count in statuses.items()},
+            }
+        return results
+
+    def report(self, results):
+        # "payload" is the hit rate of the cached responses themselves; "lookups" counts the
+        # class-version, pin and archive-year reads each request makes to find them.
+        header = f"{'endpoint':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'queries':>9}{'payload':>9}{'lookups':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in results['endpoints'].items():
+            hit_rate = f"{row['cache_hit_rate']:.0%}" if row['cache_hit_rate'] is not None else '-'
+            self.stdout.write(
+                f"{name:<28}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+                f"{row['throughput_rps']:>9}{row['queries_per_request']:>9}{hit_rate:>9}"
+                f"{row['bookkeeping_lookups_per_request']:>9}"
+            )
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+        regressions = []
+        self.stdout.write(f"\nComparison with {baseline_path} (p95 / queries per request)")
+        for name, row in results['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            if not previous:
+                self.stdout.write(f"{name:<28} new endpoint")
+                continue
+            change = (row['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0.0
+            query_change = row['queries_per_request'] - previous['queries_per_request']
+            self.stdout.write(f"{name:<28}{change:>+8.1f}%{query_change:>+9.2f}")
+            if change > threshold or query_change > 0:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Performance regressions in: {', '.join(regressions)}")
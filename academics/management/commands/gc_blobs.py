@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from academics.models import ArchivedSubmission, Submission
+from academics.storage import BLOB_PREFIX
+
+
+def reference_counts():
+    """Number of rows, live or archived, pointing at each stored file name."""
+    refs = {}
+    for model in (Submission, ArchivedSubmission):
+        rows = model.objects.exclude(file='').order_by().values('file').annotate(refs=Count('id')).values_list('file', 'refs')
+        for name, count in rows:
+            refs[name] = refs.get(name, 0) + count
+    return refs
+
+
+def is_referenced(name):
+    return any(model.objects.filter(file=name).exists() for model in (Submission, ArchivedSubmission))
+
+
+class Command(BaseCommand):
+    help = "Delete stored submission blobs that no row references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting")
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Leave files younger than this alone; they may belong to an upload in flight")
+        parser.add_argument('--include-legacy', action='store_true',
+                            help="Also sweep files written under submissions/ before content addressing")
+
+    def handle(self, *args, **options):
+        storage = Submission._meta.get_field('file').storage
+        refs = reference_counts()
+        cutoff = time.time() - options['grace_hours'] * 3600
+
+        roots = [BLOB_PREFIX] + (['submissions'] if options['include_legacy'] else [])
+        removed = removed_bytes = kept = 0
+        for root in roots:
+            for directory, _, filenames in os.walk(storage.path(root)):
+                for filename in filenames:
+                    full_path = os.path.join(directory, filename)
+                    name = os.path.relpath(full_path, storage.location).replace(os.sep, '/')
+                    stat = os.stat(full_path)
+                    if name in refs or stat.st_mtime > cutoff:
+                        kept += 1
+                        continue
+                    if options['dry_run']:
+                        self.stdout.write(f"Would delete {name} ({stat.st_size} bytes)")
+                    else:
+                        # The snapshot above may be minutes old: re-check just before
+                        # unlinking, in case an upload reused the blob since.
+                        try:
+                            fresh = os.stat(full_path).st_mtime > cutoff
+                        except FileNotFoundError:
+                            continue
+                        if fresh or is_referenced(name):
+                            kept += 1
+                            continue
+                        os.remove(full_path)
+                    removed += 1
+                    removed_bytes += stat.st_size
+
+        shared = sum(1 for count in refs.values() if count > 1)
+        saved = sum(count - 1 for count in refs.values() if count > 1)
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {removed} unreferenced files ({removed_bytes / 1024 / 1024:.1f} MiB); kept {kept}. "
+            f"{shared} blobs are shared, saving {saved} duplicate copies."
+        ))
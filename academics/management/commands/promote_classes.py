@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import SchoolClass
+from academics.promotion import next_grade_mapping, promote
+
+
+class Command(BaseCommand):
+    help = "Promote whole classes to their next class at year end"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--map', action='append', default=[], metavar='OLD=NEW',
+                            help="Class names to move between; leave NEW empty to graduate the cohort. Repeatable.")
+        parser.add_argument('--next-grade', action='store_true',
+                            help="Map every class to its namesake in the next grade; the top grade graduates")
+        parser.add_argument('--dry-run', action='store_true', help="Report the moves without making them")
+
+    def handle(self, *args, **options):
+        if options['next_grade']:
+            mapping, unmatched = next_grade_mapping(SchoolClass.objects.all())
+            for cls in unmatched:
+                self.stderr.write(f"No class found in the next grade for {cls.name}; skipped")
+        elif options['map']:
+            mapping = self.parse_map(options['map'])
+        else:
+            raise CommandError("Give --map OLD=NEW pairs or --next-grade")
+
+        report = promote(mapping, dry_run=options['dry_run'])
+        for row in report:
+            if row['to'] is None:
+                self.stdout.write(f"{row['from']:>12} -> (graduates)  {row['students']} students")
+                continue
+            line = f"{row['from']:>12} -> {row['to']:<12} {row['students']} students, {row['resulting_size']}/{row['capacity']} after"
+            self.stdout.write(self.style.WARNING(line + "  OVER CAPACITY") if row['over_capacity'] else line)
+            if row['merged_students']:
+                self.stdout.write(self.style.WARNING(
+                    f"{'':>12}    {row['merged_students']} students are also in another class moving to {row['to']}; "
+                    f"they keep one enrollment"
+                ))
+        verb = "Would move" if options['dry_run'] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(row['students'] for row in report)} students"))
+
+    def parse_map(self, pairs):
+        names = set()
+        parsed = []
+        for pair in pairs:
+            old, sep, new = pair.partition('=')
+            if not sep or not old:
+                raise CommandError(f"Invalid mapping {pair!r}; expected OLD=NEW")
+            parsed.append((old.strip(), new.strip()))
+            names.update(filter(None, (old.strip(), new.strip())))
+        ids = dict(SchoolClass.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - set(ids)
+        if missing:
+            raise CommandError(f"Unknown classes: {', '.join(sorted(missing))}")
+        return {ids[old]: ids[new] if new else None for old, new in parsed}
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .recurrence import exception_starts, last_occurrence_end
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 class Grade(models.Model):
@@ -30,6 +33,7 @@ class Announcement(models.Model):
     school_class = models.ForeignKey(
         SchoolClass, on_delete=models.CASCADE, null=True, blank=True, related_name='announcements'
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Indexed for delta sync
 
     def __str__(self):
         return self.title
@@ -43,10 +47,24 @@ class Event(models.Model):
     school_class = models.ForeignKey(
         SchoolClass, on_delete=models.CASCADE, null=True, blank=True, related_name='events'
     )
+    # RRULE body such as "FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20251128T000000Z"; blank for one-off events
+    recurrence = models.CharField(max_length=500, blank=True)
+    recurrence_exceptions = models.JSONField(default=list, blank=True)  # ISO start times of skipped occurrences
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)  # End of the last occurrence; null if unbounded
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Indexed for delta sync
 
     def __str__(self):
         return self.title
 
+    def clean(self):
+        if self.recurrence and self.start and self.end:
+            last_occurrence_end(self)  # Also validates the rule itself
+            exception_starts(self)
+
+    def save(self, *args, **kwargs):
+        self.recurrence_end = last_occurrence_end(self) if self.recurrence else self.end
+        super().save(*args, **kwargs)
+
 class SubjectChoices(models.TextChoices):
     MATHEMATICS = 'mathematics', 'Mathematics'
     ENGLISH = 'english', 'English'
@@ -78,6 +96,17 @@ class Assignment(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assignment')
     classroom = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, null=True, related_name='assignment')
     created_at = models.DateField(auto_now_add=True, db_index=True)  # Indexed for ordering
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serve the current-year listings in assignment_view
+            models.Index(fields=['created_by', '-created_at']),
+            models.Index(fields=['classroom', '-created_at']),
+            # Delta sync for teachers and students respectively
+            models.Index(fields=['created_by', 'updated_at']),
+            models.Index(fields=['classroom', 'updated_at']),
+        ]
 
     def __str__(self):
         return self.title
@@ -89,13 +118,125 @@ class Submission(models.Model):
     )
     assignment = models.ForeignKey('Assignment', on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'student'})
-    file = models.FileField(upload_to='submissions/%Y/%m/%d/')
+    file = models.FileField(upload_to='submissions/%Y/%m/%d/', storage=ContentAddressedStorage())  # Deduplicated by content hash
     submitted_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Indexed for ordering
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='submitted')
     score = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail = models.FileField(upload_to='previews/', blank=True, editable=False)  # First page, rendered in the background
+    page_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('assignment', 'student')
+        indexes = [
+            # Keyset-paginated teacher listing: ungraded first, then oldest first
+            models.Index(fields=['assignment', '-status', 'submitted_at', 'id']),
+            # Delta sync for teachers and students respectively
+            models.Index(fields=['assignment', 'updated_at']),
+            models.Index(fields=['student', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.first_name} - {self.assignment.title}"
+
+class AnnouncementReadMarker(models.Model):
+    # Everything up to last_read_id counts as read; reads above it live in a Redis bitmap.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='announcement_marker')
+    last_read_id = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} read up to {self.last_read_id}"
+
+class SubmissionFingerprint(models.Model):
+    # MinHash signature of the submission's text; its LSH buckets live in SubmissionBand.
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='fingerprint')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='+')
+    signature = models.BinaryField()  # SIMILARITY_NUM_PERM little-endian uint32 values
+
+    def __str__(self):
+        return f"Fingerprint of submission {self.submission_id}"
+
+class SubmissionBand(models.Model):
+    fingerprint = models.ForeignKey(SubmissionFingerprint, on_delete=models.CASCADE, related_name='bands')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='+', db_index=False)
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # Candidate lookup: submissions of the assignment sharing any band bucket
+            models.Index(fields=['assignment', 'band', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f"Band {self.band} of fingerprint {self.fingerprint_id}"
+
+class SimilarityFlag(models.Model):
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='similarity_flags')
+    first = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')  # Lower id of the pair
+    second = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()  # Estimated Jaccard similarity of the texts' word shingles
+    flagged_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('first', 'second')
+
+    def __str__(self):
+        return f"Submissions {self.first_id} and {self.second_id} ({self.similarity:.0%})"
+
+class Tombstone(models.Model):
+    # Left behind by deleted rows so delta-sync clients learn to drop them. The scope
+    # columns are plain ids because the rows they pointed at may be gone too.
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    school_class_id = models.BigIntegerField(null=True)
+    user_id = models.BigIntegerField(null=True)  # Assignment author or submitting student
+    parent_id = models.BigIntegerField(null=True)  # Assignment of a deleted submission
+    author_id = models.BigIntegerField(null=True)  # Author of that assignment, which may be gone as well
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+class ArchivedAssignment(models.Model):
+    # Read-only copy of an Assignment from a closed academic year; keeps the original id.
+    id = models.BigIntegerField(primary_key=True)
+    academic_year = models.PositiveIntegerField(db_index=True)
+    subject = models.CharField(choices=SubjectChoices, max_length=20)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    due = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Assignment.ASSIGNMENT_STATUS)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    classroom = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['academic_year', 'created_by']),
+            models.Index(fields=['academic_year', 'classroom']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.academic_year})"
+
+class ArchivedSubmission(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    academic_year = models.PositiveIntegerField(db_index=True)
+    assignment = models.ForeignKey(ArchivedAssignment, on_delete=models.CASCADE, related_name='submissions')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    file = models.FileField(storage=ContentAddressedStorage())
+    submitted_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Submission.STATUS_CHOICES)
+    score = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = ('assignment', 'student')
 
     def __str__(self):
-        return f"{self.student.first_name} - {self.assignment.title}"
\ No newline at end of file
+        return f"{self.student_id} - {self.assignment_id} ({self.academic_year})"
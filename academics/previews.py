@@ -0,0 +1,59 @@
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .storage import BLOB_PREFIX, file_digest
+
+# Caps concurrent poppler processes per worker process, whatever the Celery concurrency.
+_render_slots = threading.BoundedSemaphore(settings.PDF_RENDER_CONCURRENCY)
+
+
+def submission_digest(field_file):
+    # Content-addressed names already carry the digest; older uploads are hashed.
+    if field_file.name.startswith(f'{BLOB_PREFIX}/'):
+        return os.path.splitext(os.path.basename(field_file.name))[0]
+    with field_file.open('rb'):
+        return file_digest(field_file)
+
+
+def render_first_page(path):
+    """Return (png_bytes, page_count) for the PDF at ``path`` using poppler-utils."""
+    with _render_slots, tempfile.TemporaryDirectory() as workdir:
+        info = subprocess.run(
+            ['pdfinfo', path], capture_output=True, text=True, timeout=settings.PDF_RENDER_TIMEOUT, check=True
+        )
+        match = re.search(r'^Pages:\s+(\d+)', info.stdout, re.MULTILINE)
+        page_count = int(match.group(1)) if match else None
+
+        output = os.path.join(workdir, 'page')
+        subprocess.run(
+            ['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile',
+             '-scale-to', str(settings.PDF_THUMBNAIL_SIZE), path, output],
+            capture_output=True, timeout=settings.PDF_RENDER_TIMEOUT, check=True,
+        )
+        with open(f'{output}.png', 'rb') as fh:
+            return fh.read(), page_count
+
+
+def preview_for(field_file):
+    """Thumbnail name and page count for a stored PDF, rendered at most once per digest."""
+    digest = submission_digest(field_file)
+    cache_key = f'pdf_preview_{digest}'
+    preview = cache.get(cache_key)
+    if preview is not None:
+        return preview
+
+    thumbnail = f'previews/{digest}.png'
+    image, page_count = render_first_page(field_file.path)
+    if not default_storage.exists(thumbnail):
+        thumbnail = default_storage.save(thumbnail, ContentFile(image))
+    preview = {'thumbnail': thumbnail, 'page_count': page_count}
+    cache.set(cache_key, preview, timeout=None)
+    return preview
@@ -0,0 +1,156 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, Q, Value, When
+
+from .caching import bump_class_versions
+from .models import SchoolClass
+
+User = get_user_model()
+Enrollment = SchoolClass.students.through
+
+
+def next_grade_mapping(classes):
+    """Map each class to its namesake one grade up, e.g. "7 East" -> "8 East".
+
+    Classes in the top grade map to None (the cohort graduates). Returns the mapping
+    and the classes for which no destination could be found.
+    """
+    classes = list(classes.select_related('grade'))
+    levels = {cls.grade.level for cls in classes}
+    candidates = {
+        (cls.grade.level, cls.name): cls.id
+        for cls in SchoolClass.objects.filter(grade__level__in=[level + 1 for level in levels]).select_related('grade')
+    }
+    top_level = SchoolClass.objects.order_by('-grade__level').values_list('grade__level', flat=True).first()
+
+    mapping, unmatched = {}, []
+    for cls in classes:
+        level = cls.grade.level
+        if level == top_level:
+            mapping[cls.id] = None
+            continue
+        target = candidates.get((level + 1, cls.name.replace(str(level), str(level + 1), 1)))
+        if target is None:
+            unmatched.append(cls)
+        else:
+            mapping[cls.id] = target
+    return mapping, unmatched
+
+
+def merged_enrollments(mapping):
+    """Students enrolled in more than one class moving into the same destination.
+
+    Returns {destination id: {user id: number of those classes they are in}}. Each
+    such student can only keep one enrollment there.
+    """
+    moving = {old: new for old, new in mapping.items() if new}
+    if len(set(moving.values())) == len(moving):
+        return {}
+    rows = (
+        Enrollment.objects.filter(schoolclass_id__in=moving)
+        .annotate(destination=Case(*[When(schoolclass_id=old, then=Value(new)) for old, new in moving.items()]))
+        .values('destination', 'user_id').annotate(sources=Count('id')).filter(sources__gt=1)
+    )
+    merged = {}
+    for row in rows:
+        merged.setdefault(row['destination'], {})[row['user_id']] = row['sources']
+    return merged
+
+
+def promotion_report(mapping):
+    names = dict(SchoolClass.objects.filter(id__in=set(mapping) | set(filter(None, mapping.values()))).values_list('id', 'name'))
+    capacities = dict(SchoolClass.objects.filter(id__in=set(filter(None, mapping.values()))).values_list('id', 'capacity'))
+    sizes = dict(
+        Enrollment.objects.filter(schoolclass_id__in=mapping)
+        .values('schoolclass_id').annotate(total=Count('user_id')).values_list('schoolclass_id', 'total')
+    )
+    targets = set(capacities)
+    resulting = {}
+    if targets:
+        # Where each enrollment ends up: a moving cohort in its destination, and a destination's
+        # own students where they are unless that class moves on too. Counting distinct users
+        # there counts a student arriving from several places, or already present, once.
+        landing = Case(
+            *[When(schoolclass_id=old, then=Value(new)) for old, new in mapping.items() if new],
+            *[When(schoolclass_id=target, then=Value(target)) for target in targets - set(mapping)],
+        )
+        resulting = dict(
+            Enrollment.objects.filter(schoolclass_id__in=set(mapping) | targets).annotate(landing=landing)
+            .filter(landing__isnull=False).values('landing').annotate(total=Count('user_id', distinct=True))
+            .values_list('landing', 'total')
+        )
+    merged = merged_enrollments(mapping)
+    report = []
+    for old_id, new_id in mapping.items():
+        row = {
+            'from': names.get(old_id, old_id),
+            'to': names.get(new_id, new_id) if new_id else None,
+            'students': sizes.get(old_id, 0),
+        }
+        if new_id:
+            row['resulting_size'] = resulting.get(new_id, 0)
+            row['merged_students'] = len(merged.get(new_id, {}))
+            row['capacity'] = capacities[new_id]
+            row['over_capacity'] = row['resulting_size'] > capacities[new_id]
+        report.append(row)
+    return report
+
+
+def promote(mapping, dry_run=False):
+    """Move whole cohorts from old classes to new ones with a handful of set-based statements.
+
+    ``mapping`` is {old_class_id: new_class_id or None}; None graduates the cohort,
+    removing its enrollments and clearing ``User.school_class``. A student in several
+    classes that move into the same one keeps a single enrollment there; the report
+    counts them as ``merged_students``. Nothing is written when ``dry_run`` is set;
+    the report is returned either way.
+    """
+    report = promotion_report(mapping)
+    if dry_run or not mapping:
+        return report
+    merged = merged_enrollments(mapping)
+
+    moving = {old: new for old, new in mapping.items() if new}
+    graduating = [old for old, new in mapping.items() if not new]
+    with transaction.atomic():
+        # Graduates leave first, so cohorts moving into a graduating class are not swept out with them.
+        if graduating:
+            Enrollment.objects.filter(schoolclass_id__in=graduating).delete()
+        if moving:
+            # A student already enrolled in their destination would break the unique pair.
+            collisions = Q()
+            for old, new in moving.items():
+                collisions |= Q(schoolclass_id=new, user_id__in=Enrollment.objects.filter(schoolclass_id=old).values('user_id'))
+            Enrollment.objects.filter(collisions).exclude(schoolclass_id__in=moving).delete()
+            # So would two sources landing in the same destination: keep the enrollment
+            # from the first of them and drop the rest.
+            if merged:
+                kept, extra = set(), []
+                enrollments = (
+                    Enrollment.objects.filter(
+                        schoolclass_id__in=moving, user_id__in={user for users in merged.values() for user in users}
+                    )
+                    .order_by('schoolclass_id').values_list('id', 'schoolclass_id', 'user_id')
+                )
+                for enrollment_id, old, user_id in enrollments:
+                    if user_id not in merged.get(moving[old], ()):
+                        continue
+                    if (moving[old], user_id) in kept:
+                        extra.append(enrollment_id)
+                    else:
+                        kept.add((moving[old], user_id))
+                Enrollment.objects.filter(id__in=extra).delete()
+            Enrollment.objects.filter(schoolclass_id__in=moving).update(
+                schoolclass_id=Case(*[When(schoolclass_id=old, then=Value(new)) for old, new in moving.items()])
+            )
+        # Neither bulk update touches a synced model, so there is no updated_at to set:
+        # a student's changed class set already makes their next sync a reset.
+        User.objects.filter(school_class_id__in=mapping).update(
+            school_class_id=Case(*[When(school_class_id=old, then=Value(new)) for old, new in moving.items()], default=None)
+        )
+
+    bump_class_versions(*(set(mapping) | set(moving.values())))
+    # Per-user assignment and class payloads are keyed on the class versions bumped above.
+    cache.delete_many(['schoolclass_admin_queryset', 'user_admin_queryset'])
+    return report
@@ -0,0 +1,84 @@
+from django.db.models import Max, Q
+from django_redis import get_redis_connection
+
+from .models import Announcement, AnnouncementReadMarker, SchoolClass
+
+
+def _bitmap_key(user_id):
+    return f'announcement_reads:{user_id}'
+
+
+def visible_announcements(user):
+    if user.role == 'teacher':
+        classes = SchoolClass.objects.filter(teachers=user)
+    else:
+        classes = SchoolClass.objects.filter(students=user)
+    return Announcement.objects.filter(
+        Q(target_role='both') | Q(target_role=user.role),
+        Q(school_class__isnull=True) | Q(school_class__in=classes.values('id')),
+    )
+
+
+def _marker(user):
+    return AnnouncementReadMarker.objects.filter(user=user).values_list('last_read_id', flat=True).first() or 0
+
+
+def unread_count(user):
+    """Visible announcements above the user's high-water mark, less those read since.
+
+    One COUNT and one BITCOUNT, however many announcements there are: the bitmap only
+    ever holds bits above the mark (mark_all_read drops it when the mark moves), and
+    deleted announcements are cleared from it. Reads of announcements that later left
+    the user's view (a class change) can hide as many unread ones, until the next read-all,
+    as can a deleted announcement until clear_deleted_reads() has run.
+    """
+    visible = visible_announcements(user).filter(id__gt=_marker(user)).count()
+    if not visible:
+        return 0
+    return max(visible - get_redis_connection('default').bitcount(_bitmap_key(user.id)), 0)
+
+
+def mark_read(user, announcement_id):
+    if not visible_announcements(user).filter(id=announcement_id).exists():
+        return False
+    if announcement_id > _marker(user):  # At or below the mark it is read already
+        get_redis_connection('default').setbit(_bitmap_key(user.id), announcement_id, 1)
+    return True
+
+
+_DELETED_KEY = 'announcement_reads_deleted'
+
+
+def forget_reads(announcement_id):
+    """Queue a deleted announcement's bit for clearing; True when nothing else was queued.
+
+    Until clear_deleted_reads() runs, the stale bit can hide one unread announcement.
+    """
+    pipeline = get_redis_connection('default').pipeline(transaction=True)
+    pipeline.sadd(_DELETED_KEY, announcement_id)
+    pipeline.scard(_DELETED_KEY)
+    return pipeline.execute()[1] == 1
+
+
+def clear_deleted_reads():
+    """Clear every queued announcement's bit from all bitmaps in a single keyspace scan."""
+    connection = get_redis_connection('default')
+    pipeline = connection.pipeline(transaction=True)
+    pipeline.smembers(_DELETED_KEY)
+    pipeline.delete(_DELETED_KEY)
+    announcement_ids = [int(value) for value in pipeline.execute()[0]]
+    if not announcement_ids:
+        return 0
+    pipeline = connection.pipeline(transaction=False)
+    for key in connection.scan_iter(match=_bitmap_key('*'), count=1000):
+        for announcement_id in announcement_ids:
+            pipeline.setbit(key, announcement_id, 0)
+    pipeline.execute()
+    return len(announcement_ids)
+
+
+def mark_all_read(user):
+    latest = Announcement.objects.aggregate(latest=Max('id'))['latest'] or 0
+    AnnouncementReadMarker.objects.update_or_create(user=user, defaults={'last_read_id': latest})
+    # Every bit at or below the new mark is now implied by it.
+    get_redis_connection('default').delete(_bitmap_key(user.id))
@@ -0,0 +1,81 @@
+import re
+from itertools import islice
+
+from dateutil.rrule import rruleset, rrulestr
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+_BOUNDED = re.compile(r'(?:^|[;:\s])(?:COUNT|UNTIL)=', re.IGNORECASE)
+# Anything more frequent than daily can expand to millions of occurrences per request.
+_SUB_DAILY = re.compile(r'(?:^|[;:\s])FREQ=(?:HOURLY|MINUTELY|SECONDLY)\b', re.IGNORECASE)
+
+
+def _parse_rule(event):
+    try:
+        rule = rrulestr(event.recurrence, dtstart=event.start)
+    except (ValueError, TypeError) as e:
+        raise ValidationError({'recurrence': f"Invalid recurrence rule: {e}"})
+    if isinstance(rule, rruleset):
+        # EXDATE/RDATE/multiple RRULEs parse to a set; skipped dates belong in recurrence_exceptions.
+        raise ValidationError({'recurrence': "Only a single RRULE is supported; list skipped dates in recurrence_exceptions"})
+    return rule
+
+
+def build_rule(event):
+    """The event's rule, validated for saving."""
+    rule = _parse_rule(event)
+    if _SUB_DAILY.search(event.recurrence):
+        raise ValidationError({'recurrence': "Events can repeat at most daily"})
+    return rule
+
+
+def exception_starts(event):
+    """Skipped occurrence starts as aware datetimes; naive values are read in the current time zone."""
+    starts = set()
+    for value in event.recurrence_exceptions:
+        start = parse_datetime(value) if isinstance(value, str) else None
+        if start is None:
+            raise ValidationError({'recurrence_exceptions': f"Invalid exception start: {value!r}"})
+        starts.add(timezone.make_aware(start) if timezone.is_naive(start) else start)
+    return starts
+
+
+def last_occurrence_end(event):
+    """End of the final occurrence, or None when the rule repeats forever.
+
+    Raises ValidationError for a series longer than RECURRENCE_MAX_OCCURRENCES.
+    """
+    rule = build_rule(event)
+    if not _BOUNDED.search(event.recurrence):
+        return None
+    starts = list(islice(rule, settings.RECURRENCE_MAX_OCCURRENCES + 1))
+    if len(starts) > settings.RECURRENCE_MAX_OCCURRENCES:
+        raise ValidationError(
+            {'recurrence': f"A series may have at most {settings.RECURRENCE_MAX_OCCURRENCES} occurrences"}
+        )
+    return (starts[-1] if starts else event.start) + (event.end - event.start)
+
+
+def occurrences(event, window_start, window_end):
+    """Yield (start, end) for each occurrence of ``event`` overlapping the window.
+
+    Occurrences are generated lazily from the rule, starting just before the window,
+    so cost depends on the window size rather than on how long the series runs. At most
+    RECURRENCE_MAX_OCCURRENCES are expanded, in case a rule saved before build_rule
+    refused sub-daily frequencies is still around.
+    """
+    if not event.recurrence:
+        if event.start < window_end and event.end > window_start:
+            yield event.start, event.end
+        return
+
+    duration = event.end - event.start
+    skipped = exception_starts(event)
+    starts = _parse_rule(event).xafter(window_start - duration, inc=False)
+    for start in islice(starts, settings.RECURRENCE_MAX_OCCURRENCES):
+        if start >= window_end:
+            break
+        if start not in skipped:
+            yield start, start + duration
@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch.dispatcher import receiver
+
+from .caching import bump_class_versions
+from .models import Announcement, Assignment, Event, SchoolClass, Submission
+from .read_state import forget_reads
+from .sync import record_deletion, recording_deletions
+from .tasks import clear_deleted_announcement_reads, detect_similar_submissions, generate_submission_preview
+
+
+@receiver(pre_save, sender=Submission)
+def note_submission_file_change(sender, instance, update_fields=None, **kwargs):
+    # post_save can no longer see the stored row. Grading saves leave the file alone
+    # and must not re-index it: that would drop flags a teacher has already seen.
+    if update_fields is not None and 'file' not in update_fields:
+        instance._file_changed = False
+    elif instance.pk is None:
+        instance._file_changed = True
+    else:
+        stored = Submission.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+        instance._file_changed = stored != instance.file.name
+
+
+@receiver(post_save, sender=Submission)
+def queue_submission_preview(sender, instance, created, **kwargs):
+    if instance.file and (created or instance.__dict__.pop('_file_changed', True)):
+        transaction.on_commit(lambda: generate_submission_preview.delay(instance.id))
+        transaction.on_commit(lambda: detect_similar_submissions.delay(instance.id))
+
+
+def _assignment_class_id(submission):
+    if Submission.assignment.is_cached(submission):
+        return submission.assignment.classroom_id
+    return Assignment.objects.filter(id=submission.assignment_id).values_list('classroom_id', flat=True).first()
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def submission_changed(sender, instance, **kwargs):
+    # Submitting, grading and deleting all change the counts cached per class version.
+    if not recording_deletions():
+        return  # A bulk delete (year archiving) bumps the classes once per batch
+    class_id = _assignment_class_id(instance)
+    if class_id is not None:
+        bump_class_versions(class_id)
+
+
+@receiver(post_delete, sender=Assignment)
+def assignment_deleted(sender, instance, **kwargs):
+    if instance.classroom_id is not None and recording_deletions():
+        bump_class_versions(instance.classroom_id)
+
+
+@receiver(post_save, sender=SchoolClass)
+def school_class_saved(sender, instance, **kwargs):
+    bump_class_versions(instance.id)
+
+
+@receiver(m2m_changed, sender=SchoolClass.teachers.through)
+@receiver(m2m_changed, sender=SchoolClass.students.through)
+def school_class_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # A reverse clear() (user.enrolled_classes.clear()) carries no pk_set, but the
+    # user's changed class set already gives them fresh keys.
+    class_ids = (pk_set or ()) if reverse else (instance.id,)
+    bump_class_versions(*class_ids)
+
+
+@receiver(post_delete, sender=Assignment)
+def assignment_tombstone(sender, instance, **kwargs):
+    record_deletion('assignments', instance.id, school_class_id=instance.classroom_id, user_id=instance.created_by_id)
+
+
+@receiver(post_delete, sender=Submission)
+def submission_tombstone(sender, instance, **kwargs):
+    if not recording_deletions():
+        return  # Skip the lookup below; the bulk delete writes its own tombstones
+    # Still there when its deletion cascades here: related rows are deleted first.
+    author_id = Assignment.objects.filter(id=instance.assignment_id).values_list('created_by_id', flat=True).first()
+    record_deletion(
+        'submissions', instance.id, user_id=instance.student_id, parent_id=instance.assignment_id, author_id=author_id
+    )
+
+
+@receiver(post_delete, sender=Announcement)
+def announcement_tombstone(sender, instance, **kwargs):
+    record_deletion('announcements', instance.id, school_class_id=instance.school_class_id)
+    # Queued rather than cleared here: clearing scans every user's bitmap, and a bulk
+    # delete of many announcements should pay for that scan once, in the background.
+    if forget_reads(instance.id):
+        transaction.on_commit(clear_deleted_announcement_reads.delay)
+
+
+@receiver(post_delete, sender=Event)
+def event_tombstone(sender, instance, **kwargs):
+    record_deletion('events', instance.id, school_class_id=instance.school_class_id)
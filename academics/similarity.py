@@ -0,0 +1,135 @@
+import re
+import subprocess
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import SimilarityFlag, Submission, SubmissionBand, SubmissionFingerprint
+from .previews import submission_digest
+
+# Fixed seed: signatures are stored, so every worker must draw the same hash functions.
+_rng = np.random.default_rng(20240601)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, size=settings.SIMILARITY_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, size=settings.SIMILARITY_NUM_PERM, dtype=np.uint64)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_CHUNK = 4096  # Shingles hashed at once; bounds the (permutations x chunk) working array
+
+_WORD = re.compile(r'\w+')
+
+
+def extract_text(path):
+    result = subprocess.run(
+        ['pdftotext', '-q', '-l', str(settings.SIMILARITY_MAX_PAGES), path, '-'],
+        capture_output=True, timeout=settings.PDF_RENDER_TIMEOUT, check=True,
+    )
+    return result.stdout.decode('utf-8', errors='ignore')
+
+
+def shingle_hashes(text):
+    """Distinct 64-bit hashes of every run of SIMILARITY_SHINGLE_WORDS consecutive words."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    width = min(settings.SIMILARITY_SHINGLE_WORDS, len(words))
+    count = len(words) - width + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        hashes = hashes * _MIX + word_hashes[offset:offset + count]  # Wraps mod 2**64
+    return np.unique(hashes)
+
+
+def minhash(hashes):
+    """MinHash signature: the minimum of each of the random hash functions over all shingles."""
+    signature = np.full(settings.SIMILARITY_NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint64)
+    for start in range(0, len(hashes), _CHUNK):
+        chunk = hashes[start:start + _CHUNK]
+        values = (_MULTIPLIERS[:, None] * chunk[None, :] + _OFFSETS[:, None]) >> np.uint64(32)
+        np.minimum(signature, values.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_buckets(signature):
+    """One bucket per LSH band; signatures agreeing on a whole band land in the same bucket."""
+    bands = signature.reshape(settings.SIMILARITY_BANDS, -1).astype(np.uint64)
+    buckets = np.zeros(len(bands), dtype=np.uint64)
+    for column in bands.T:
+        buckets = buckets * _MIX + column
+    return [int(bucket) for bucket in buckets >> np.uint64(1)]  # Fits a signed BigIntegerField
+
+
+def estimated_similarity(first, second):
+    return float(np.mean(first == second))
+
+
+def signature_for(field_file):
+    """MinHash signature of a stored PDF, or None when it has no extractable text.
+
+    Computed once per file content, however many submissions share it.
+    """
+    cache_key = f'minhash_{submission_digest(field_file)}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return np.frombuffer(cached, dtype=np.uint32) if cached else None
+    hashes = shingle_hashes(extract_text(field_file.path))
+    signature = minhash(hashes) if len(hashes) >= settings.SIMILARITY_MIN_SHINGLES else None
+    cache.set(cache_key, signature.tobytes() if signature is not None else b'', timeout=None)
+    return signature
+
+
+def _flag(assignment_id, pairs):
+    SimilarityFlag.objects.bulk_create(
+        [
+            SimilarityFlag(assignment_id=assignment_id, first_id=min(a, b), second_id=max(a, b), similarity=similarity)
+            for a, b, similarity in pairs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def index_submission(submission):
+    """(Re)index one submission in its assignment's LSH index and flag likely copies.
+
+    Returns the number of other submissions it was flagged against.
+    """
+    signature = signature_for(submission.file)
+    assignment_id = submission.assignment_id
+
+    # Index first and commit, then look for neighbours: of two submissions indexed
+    # at the same moment, at least one is guaranteed to see the other.
+    with transaction.atomic():
+        SubmissionFingerprint.objects.filter(submission=submission).delete()
+        SimilarityFlag.objects.filter(Q(first=submission) | Q(second=submission)).delete()
+        if signature is not None:
+            fingerprint = SubmissionFingerprint.objects.create(
+                submission=submission, assignment_id=assignment_id, signature=signature.tobytes()
+            )
+            SubmissionBand.objects.bulk_create([
+                SubmissionBand(fingerprint=fingerprint, assignment_id=assignment_id, band=band, bucket=bucket)
+                for band, bucket in enumerate(band_buckets(signature))
+            ])
+
+    # Content-addressed storage makes byte-identical uploads share a file name.
+    pairs = [
+        (submission.id, other_id, 1.0)
+        for other_id in Submission.objects.filter(assignment_id=assignment_id, file=submission.file.name)
+        .exclude(id=submission.id).values_list('id', flat=True)
+    ]
+    if signature is not None:
+        in_shared_bucket = Q()
+        for band, bucket in enumerate(band_buckets(signature)):
+            in_shared_bucket |= Q(band=band, bucket=bucket)
+        candidates = SubmissionFingerprint.objects.filter(
+            id__in=SubmissionBand.objects.filter(in_shared_bucket, assignment_id=assignment_id).values('fingerprint_id')
+        ).exclude(submission=submission).values_list('submission_id', 'signature')
+        identical = {other_id for _, other_id, _ in pairs}
+        for other_id, other_signature in candidates:
+            similarity = estimated_similarity(signature, np.frombuffer(other_signature, dtype=np.uint32))
+            if other_id not in identical and similarity >= settings.SIMILARITY_THRESHOLD:
+                pairs.append((submission.id, other_id, similarity))
+    _flag(assignment_id, pairs)
+    return len(pairs)
@@ -0,0 +1,50 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct file once, under the SHA-256 of its content.
+
+    ``upload_to`` only contributes the extension; identical uploads resolve to the
+    same blob, and blobs no longer referenced are removed by ``manage.py gc_blobs``.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name is decided by the content in _save.
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(file_digest(content), os.path.splitext(name)[1].lower())
+        if self.exists(name):
+            try:
+                # Restart gc_blobs' grace period: the row about to reference this blob
+                # may not be committed by the time the collector looks.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass  # Collected in between; write it afresh
+        # Write beside the target and rename into place, so a concurrent upload of
+        # the same content can never be observed half-written.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
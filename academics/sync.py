@@ -0,0 +1,162 @@
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import live_listing_filter
+from .fieldsets import ANNOUNCEMENT_FIELDS, ASSIGNMENT_FIELDS, serialize
+from .models import Assignment, Event, SchoolClass, Submission, Tombstone
+from .read_state import visible_announcements
+
+CURSOR_SALT = 'academics.sync'
+
+_suppressed = ContextVar('tombstones_suppressed', default=False)
+
+
+def recording_deletions():
+    return not _suppressed.get()
+
+
+def record_deletion(model, object_id, **scope):
+    if recording_deletions():
+        Tombstone.objects.create(model=model, object_id=object_id, **scope)
+
+
+@contextmanager
+def tombstones_suppressed():
+    # For bulk deletes that write their own tombstones with bulk_create, and bump
+    # the class versions once rather than per row.
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def user_class_ids(user):
+    if user.role == 'teacher':
+        classes = SchoolClass.objects.filter(teachers=user)
+    else:
+        classes = SchoolClass.objects.filter(students=user)
+    return sorted(classes.values_list('id', flat=True))
+
+
+def issue_cursor(moment, class_ids):
+    return signing.dumps({'since': moment.isoformat(), 'classes': class_ids}, salt=CURSOR_SALT)
+
+
+def read_cursor(cursor, class_ids):
+    """Point in time ``cursor`` resumes from, or None when the client has to start over.
+
+    That happens without a cursor, once its tombstones may have been pruned, or when
+    the user's classes changed (rows in a new class are older than the cursor).
+    Raises ValueError for a cursor the server did not issue.
+    """
+    if not cursor:
+        return None
+    try:
+        payload = signing.loads(cursor, salt=CURSOR_SALT, max_age=datetime.timedelta(days=settings.SYNC_TOMBSTONE_DAYS))
+    except signing.SignatureExpired:
+        return None
+    except signing.BadSignature:
+        raise ValueError("Invalid sync cursor")
+    if payload.get('classes') != class_ids:
+        return None
+    return parse_datetime(payload['since'])
+
+
+def _assignment_item(assignment):
+    return {**serialize(ASSIGNMENT_FIELDS, assignment, None), 'updated_at': assignment.updated_at.isoformat()}
+
+
+def _submission_item(submission):
+    return {
+        'id': submission.id,
+        'assignment': submission.assignment_id,
+        'student': submission.student_id,
+        'student_name': submission.student.first_name + " " + submission.student.last_name,
+        'file': submission.file.url,
+        'submitted_at': submission.submitted_at.isoformat(),
+        'status': submission.status,
+        'score': submission.score,
+        'thumbnail': submission.thumbnail.url if submission.thumbnail else None,
+        'page_count': submission.page_count,
+        'updated_at': submission.updated_at.isoformat(),
+    }
+
+
+def _announcement_item(announcement):
+    return {**serialize(ANNOUNCEMENT_FIELDS, announcement, None), 'updated_at': announcement.updated_at.isoformat()}
+
+
+def _event_item(event):
+    # Series are sent unexpanded; clients expand the rule for whatever range they show.
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'start': event.start.isoformat(),
+        'end': event.end.isoformat(),
+        'school_class': event.school_class.name if event.school_class else None,
+        'allDay': event.allDay,
+        'recurrence': event.recurrence,
+        'recurrence_exceptions': event.recurrence_exceptions,
+        'updated_at': event.updated_at.isoformat(),
+    }
+
+
+def _scope(user, class_ids):
+    """Live rows and tombstones the user can see, per collection."""
+    in_classes = Q(school_class_id__isnull=True) | Q(school_class_id__in=class_ids)
+    if user.role == 'teacher':
+        assignments = Assignment.objects.filter(created_by=user)
+        submissions = Submission.objects.filter(assignment__created_by=user)
+        deleted_assignments = Q(user_id=user.id)
+        # By author, not by live assignment: deleting an assignment takes its submissions with it.
+        deleted_submissions = Q(author_id=user.id)
+    else:
+        assignments = Assignment.objects.filter(classroom_id__in=class_ids)
+        submissions = Submission.objects.filter(student=user)
+        deleted_assignments = Q(school_class_id__in=class_ids)
+        deleted_submissions = Q(user_id=user.id)
+    return {
+        'assignments': (assignments.filter(live_listing_filter()), _assignment_item, deleted_assignments),
+        'submissions': (
+            submissions.filter(live_listing_filter('assignment__')).select_related('student'),
+            _submission_item, deleted_submissions,
+        ),
+        'announcements': (visible_announcements(user), _announcement_item, in_classes),
+        'events': (
+            Event.objects.filter(Q(school_class__isnull=True) | Q(school_class_id__in=class_ids)).select_related('school_class'),
+            _event_item, in_classes,
+        ),
+    }
+
+
+def changes_since(user, cursor=None):
+    """Rows created, changed or deleted in the user's scope since ``cursor`` was issued.
+
+    Without a usable cursor the whole scope is returned with ``reset`` set, and the
+    client should replace its copy. The response carries the cursor for next time.
+    """
+    class_ids = user_class_ids(user)
+    since = read_cursor(cursor, class_ids)
+    # A row committed just after the previous response can carry a timestamp from
+    # before it, so windows overlap a little. Clients upsert by id, so repeats are harmless.
+    next_since = timezone.now() - datetime.timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS)
+
+    payload = {'reset': since is None, 'deleted': {}}
+    for name, (rows, item, deleted) in _scope(user, class_ids).items():
+        if since is not None:
+            rows = rows.filter(updated_at__gt=since)
+            payload['deleted'][name] = list(
+                Tombstone.objects.filter(deleted, model=name, deleted_at__gt=since).values_list('object_id', flat=True)
+            )
+        payload[name] = [item(row) for row in rows.order_by('id')]
+    payload['cursor'] = issue_cursor(next_since, class_ids)
+    return payload
@@ -0,0 +1,165 @@
+import datetime
+import logging
+from itertools import groupby
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .caching import rebuild, release
+from .models import Assignment, Submission, Tombstone
+from .previews import preview_for
+from .read_state import clear_deleted_reads
+from .similarity import index_submission
+
+logger = logging.getLogger(__name__)
+
+
+def pending_submissions(window_start, window_end):
+    # Anti-join over class enrollment: every (assignment, student) pair in the
+    # window for which no submission row exists, ordered so rows group by student.
+    return (
+        Assignment.objects.filter(
+            due__gte=window_start,
+            due__lt=window_end,
+            classroom__students__is_active=True,
+        )
+        .annotate(
+            student_id=F('classroom__students'),
+            student_email=F('classroom__students__email'),
+            student_first_name=F('classroom__students__first_name'),
+        )
+        .filter(~Exists(Submission.objects.filter(assignment=OuterRef('pk'), student=OuterRef('student_id'))))
+        .values('id', 'title', 'subject', 'due', 'student_id', 'student_email', 'student_first_name')
+        .order_by('student_id', 'due')
+    )
+
+
+def _reminder_key(assignment_id, student_id):
+    return f'due_reminder_{assignment_id}_{student_id}'
+
+
+@shared_task
+def send_due_reminders(hours=None):
+    hours = hours or settings.DUE_REMINDER_WINDOW_HOURS
+    now = timezone.now()
+    rows = pending_submissions(now, now + datetime.timedelta(hours=hours)).iterator(chunk_size=2000)
+
+    batch, batches = [], 0
+    for student_id, student_rows in groupby(rows, key=lambda row: row['student_id']):
+        student_rows = list(student_rows)
+        batch.append({
+            'student_id': student_id,
+            'email': student_rows[0]['student_email'],
+            'first_name': student_rows[0]['student_first_name'],
+            'assignments': [
+                {'id': row['id'], 'title': row['title'], 'subject': row['subject'], 'due': row['due'].isoformat()}
+                for row in student_rows
+            ],
+        })
+        if len(batch) >= settings.DUE_REMINDER_BATCH_SIZE:
+            _queue_reminder_batch(batch, batches)
+            batch, batches = [], batches + 1
+    if batch:
+        _queue_reminder_batch(batch, batches)
+        batches += 1
+    logger.info(f"Queued {batches} due reminder batches for the next {hours} hours")
+    return batches
+
+
+def _queue_reminder_batch(batch, position):
+    # Spread batches out so the mail server sees a steady trickle rather than a burst.
+    send_due_reminder_batch.apply_async(
+        args=[batch], countdown=position * settings.DUE_REMINDER_BATCH_INTERVAL
+    )
+
+
+@shared_task(rate_limit='30/m')
+def send_due_reminder_batch(batch):
+    keys = [
+        _reminder_key(assignment['id'], student['student_id'])
+        for student in batch for assignment in student['assignments']
+    ]
+    already_sent = cache.get_many(keys)
+
+    messages, sent_keys = [], {}
+    for student in batch:
+        assignments = [
+            assignment for assignment in student['assignments']
+            if _reminder_key(assignment['id'], student['student_id']) not in already_sent
+        ]
+        if not assignments:
+            continue
+        lines = "\n".join(f"- {a['title']} ({a['subject']}), due {a['due']}" for a in assignments)
+        messages.append(EmailMessage(
+            subject='Assignments due soon',
+            body=f"Hi {student['first_name']},\n\nYou have not yet submitted:\n{lines}\n",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[student['email']],
+        ))
+        for assignment in assignments:
+            sent_keys[_reminder_key(assignment['id'], student['student_id'])] = 1
+
+    if not messages:
+        return 0
+    # One SMTP connection for the whole batch.
+    with get_connection(fail_silently=False) as connection:
+        sent = connection.send_messages(messages)
+    cache.set_many(sent_keys, timeout=settings.DUE_REMINDER_WINDOW_HOURS * 3600)
+    return sent
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def generate_submission_preview(self, submission_id):
+    submission = Submission.objects.filter(id=submission_id).only('id', 'file', 'thumbnail').first()
+    if submission is None or not submission.file or not submission.file.storage.exists(submission.file.name):
+        return None
+    try:
+        preview = preview_for(submission.file)
+    except Exception as e:
+        logger.warning(f"Preview rendering failed for submission {submission_id}: {e}")
+        raise self.retry(exc=e)
+    # Guard on the file name so a resubmission that landed meanwhile keeps its own preview.
+    # update() skips auto_now, and without a new updated_at /api/sync would never send it.
+    # Same clock as auto_now and the sync cursor, so skew cannot hide the change.
+    Submission.objects.filter(id=submission_id, file=submission.file.name).update(
+        thumbnail=preview['thumbnail'], page_count=preview['page_count'], updated_at=timezone.now()
+    )
+    return preview
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def detect_similar_submissions(self, submission_id):
+    submission = Submission.objects.filter(id=submission_id).only('id', 'assignment', 'file').first()
+    if submission is None or not submission.file or not submission.file.storage.exists(submission.file.name):
+        return None
+    try:
+        return index_submission(submission)
+    except Exception as e:
+        logger.warning(f"Similarity indexing failed for submission {submission_id}: {e}")
+        raise self.retry(exc=e)
+
+
+@shared_task
+def prune_tombstones():
+    # Sync cursors older than this are refused, so nobody needs these tombstones any more.
+    cutoff = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def clear_deleted_announcement_reads():
+    return clear_deleted_reads()
+
+
+@shared_task
+def refresh_cached_payload(name, args, key, timeout):
+    from . import views  # noqa: F401  Registers the payload builders in worker processes
+    try:
+        rebuild(name, args, key, timeout)
+    finally:
+        release(key)
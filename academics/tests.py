@@ -1,3 +1,570 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import random
+from unittest import mock, skipIf
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+
+from accounts.models import User
+from academics import caching, similarity
+from academics.export import csv_stream, xlsx_stream
+from academics.models import (
+    Assignment, Event, Grade, SchoolClass, SimilarityFlag, Submission, SubmissionBand, TeacherSubject,
+)
+from academics.promotion import Enrollment, next_grade_mapping, promote
+from academics.recurrence import last_occurrence_end, occurrences
+from academics.sync import changes_since
+from academics.tasks import pending_submissions
+from academics.views import decode_submissions_cursor, encode_submissions_cursor
+
+try:
+    import openpyxl
+except ImportError:  # Optional: only XLSX export needs it
+    openpyxl = None
+
+
+class SubmissionsCursorTests(TestCase):
+    url = '/api/assignments/submissions'
+
+    @classmethod
+    def setUpTestData(cls):
+        school_class = SchoolClass.objects.create(name='7A', capacity=40, grade=Grade.objects.create(level=7))
+        cls.teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        cls.assignment = Assignment.objects.create(
+            title='Essay', due=timezone.now() + datetime.timedelta(days=1), created_by=cls.teacher, classroom=school_class
+        )
+        for index in range(5):
+            student = User.objects.create_user(f'student{index}@example.com', role='student', is_active=True)
+            Submission.objects.create(
+                assignment=cls.assignment, student=student, file=f'essay{index}.pdf',
+                status='graded' if index in (1, 3) else 'submitted',
+            )
+        # Same timestamp everywhere, so only the id can break ties between rows.
+        cls.moment = timezone.now().replace(microsecond=0)
+        Submission.objects.update(submitted_at=cls.moment)
+
+    def get(self, **params):
+        token = jwt.encode({'user_id': self.teacher.id, 'is_2fa_verified': True}, settings.SECRET_KEY, algorithm='HS256')
+        return self.client.get(
+            self.url, {'assignment_id': self.assignment.id, **params}, HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def test_cursor_round_trip(self):
+        submission = Submission.objects.first()
+        self.assertEqual(
+            decode_submissions_cursor(encode_submissions_cursor(submission)),
+            (submission.status, self.moment, submission.id),
+        )
+
+    def test_pages_break_ties_on_id(self):
+        seen, cursor = [], None
+        while True:
+            response = self.get(limit=2, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            seen += [(item['status'], item['id']) for item in page['submissions']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = list(Submission.objects.order_by('-status', 'id').values_list('status', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in (
+            'not-base64!',
+            urlsafe_base64_encode(b'{"status": "submitted"}'),
+            urlsafe_base64_encode(b'["submitted", "yesterday", 1]'),
+            urlsafe_base64_encode(b'["submitted", "2025-01-01T00:00:00+00:00"]'),
+            urlsafe_base64_encode(b'["submitted", "2025-01-01T00:00:00+00:00", "one"]'),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(cursor=cursor).status_code, 400)
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school_class = SchoolClass.objects.create(name='7A', capacity=40, grade=Grade.objects.create(level=7))
+        cls.teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        cls.student = User.objects.create_user('student@example.com', role='student', is_active=True)
+        cls.school_class.teachers.add(cls.teacher)
+        cls.school_class.students.add(cls.student)
+        cls.assignment = Assignment.objects.create(
+            title='Essay', due=timezone.now() + datetime.timedelta(days=1),
+            created_by=cls.teacher, classroom=cls.school_class,
+        )
+        cls.submission = Submission.objects.create(assignment=cls.assignment, student=cls.student, file='essay.pdf')
+
+    def ids(self, payload, name):
+        return [item['id'] for item in payload[name]]
+
+    def test_first_sync_resets_with_everything_in_scope(self):
+        payload = changes_since(self.teacher)
+        self.assertTrue(payload['reset'])
+        self.assertEqual(self.ids(payload, 'assignments'), [self.assignment.id])
+        self.assertEqual(self.ids(payload, 'submissions'), [self.submission.id])
+        self.assertEqual(payload['deleted'], {})
+
+    def test_cursor_returns_only_changes(self):
+        cursor = changes_since(self.student)['cursor']
+        # Past the overlap, untouched rows are not sent again.
+        Submission.objects.update(updated_at=timezone.now() - datetime.timedelta(minutes=1))
+        Assignment.objects.update(updated_at=timezone.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(changes_since(self.student, cursor)['submissions'], [])
+
+        self.submission.score = 7
+        self.submission.save()
+        payload = changes_since(self.student, cursor)
+        self.assertFalse(payload['reset'])
+        self.assertEqual(self.ids(payload, 'submissions'), [self.submission.id])
+        self.assertEqual(payload['assignments'], [])
+
+    def test_windows_overlap(self):
+        cursor = changes_since(self.student)['cursor']
+        # Committed just before the previous response was built, but carrying an earlier timestamp.
+        late = timezone.now() - datetime.timedelta(seconds=settings.SYNC_CURSOR_OVERLAP_SECONDS / 2)
+        Submission.objects.update(updated_at=late)
+        self.assertEqual(self.ids(changes_since(self.student, cursor), 'submissions'), [self.submission.id])
+
+    def test_deleted_assignment_tombstones_its_submissions_for_the_teacher(self):
+        cursor = changes_since(self.teacher)['cursor']
+        assignment_id, submission_id = self.assignment.id, self.submission.id
+        self.assignment.delete()
+        deleted = changes_since(self.teacher, cursor)['deleted']
+        self.assertEqual(deleted['assignments'], [assignment_id])
+        self.assertEqual(deleted['submissions'], [submission_id])
+
+    def test_deleted_submission_reaches_the_student(self):
+        cursor = changes_since(self.student)['cursor']
+        submission_id = self.submission.id
+        self.submission.delete()
+        self.assertEqual(changes_since(self.student, cursor)['deleted']['submissions'], [submission_id])
+
+    def test_class_change_forces_a_reset(self):
+        cursor = changes_since(self.student)['cursor']
+        SchoolClass.objects.create(name='7B', capacity=40, grade=self.school_class.grade).students.add(self.student)
+        self.assertTrue(changes_since(self.student, cursor)['reset'])
+
+    def test_tampered_cursor_is_rejected(self):
+        cursor = changes_since(self.student)['cursor']
+        with self.assertRaises(ValueError):
+            changes_since(self.student, cursor[:-2] + 'xx')
+
+
+class AssignmentDashboardTests(TestCase):
+    url = '/api/assignments/dashboard'
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(level=7)
+        cls.school_class = SchoolClass.objects.create(name='7A', capacity=40, grade=grade)
+        cls.teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        students = [
+            User.objects.create_user(f'student{index}@example.com', role='student', is_active=True)
+            for index in range(3)
+        ]
+        cls.school_class.students.add(*students)
+        # Not among the class's teachers, yet the dashboard must still count their assignment.
+        cls.assignment = Assignment.objects.create(
+            title='Essay', due=timezone.now() + datetime.timedelta(days=1),
+            created_by=cls.teacher, classroom=cls.school_class,
+        )
+        cls.submitted = Submission.objects.create(assignment=cls.assignment, student=students[0], file='a.pdf')
+        Submission.objects.create(assignment=cls.assignment, student=students[1], file='b.pdf', status='graded', score=9)
+        # Another class's enrolment must not leak into this class size.
+        SchoolClass.objects.create(name='7B', capacity=40, grade=grade).students.add(students[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        token = jwt.encode({'user_id': self.teacher.id, 'is_2fa_verified': True}, settings.SECRET_KEY, algorithm='HS256')
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        [row] = response.json()['assignments']
+        return {key: row[key] for key in ('class_size', 'submitted', 'graded', 'missing')}
+
+    def test_counts(self):
+        self.assertEqual(self.counts(), {'class_size': 3, 'submitted': 1, 'graded': 1, 'missing': 1})
+
+    def test_grading_refreshes_cached_counts(self):
+        self.counts()
+        self.submitted.status, self.submitted.score = 'graded', 7
+        self.submitted.save()
+        self.assertEqual(self.counts(), {'class_size': 3, 'submitted': 0, 'graded': 2, 'missing': 1})
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'caching-tests'}},
+    CACHE_REBUILD_WAIT_SECONDS=0,
+)
+class PayloadCacheTests(SimpleTestCase):
+    key = 'payload_test'
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+        def build(value):
+            self.builds += 1
+            return value
+
+        patcher = mock.patch.dict(caching._builders, {'test': build})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, value='new', background=False):
+        return caching.get_or_build('test', value, key=self.key, timeout=60, background=background)
+
+    def store_stale(self):
+        caching.store(self.key, 'old', timeout=-1, build_time=0)
+
+    def test_miss_builds_and_stores_an_envelope(self):
+        self.assertEqual(self.get(), 'new')
+        self.assertEqual(self.get('other'), 'new')
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(cache.get(self.key).keys(), {'value', 'expires', 'delta'})
+        self.assertIsNone(cache.get(caching._lock_key(self.key)))
+
+    def test_bare_values_are_misses(self):
+        cache.set(self.key, {'assignments': []})
+        self.assertEqual(self.get(), 'new')
+
+    def test_stale_entry_is_served_while_another_worker_rebuilds(self):
+        self.store_stale()
+        cache.add(caching._lock_key(self.key), 1)
+        self.assertEqual(self.get(), 'old')
+        self.assertEqual(self.builds, 0)
+
+    def test_stale_entry_is_rebuilt_by_one_caller(self):
+        self.store_stale()
+        self.assertEqual(self.get(), 'new')
+        self.assertEqual(self.builds, 1)
+
+    def test_background_rebuild_serves_stale(self):
+        self.store_stale()
+        with mock.patch('academics.tasks.refresh_cached_payload.delay') as delay:
+            self.assertEqual(self.get(background=True), 'old')
+        delay.assert_called_once_with('test', ['new'], self.key, 60)
+        self.assertIsNotNone(cache.get(caching._lock_key(self.key)))
+
+    def test_background_rebuild_without_a_broker_releases_the_lock(self):
+        self.store_stale()
+        with mock.patch('academics.tasks.refresh_cached_payload.delay', side_effect=ConnectionError), \
+                self.assertLogs(caching.logger, 'ERROR'):
+            self.assertEqual(self.get(background=True), 'old')
+        self.assertIsNone(cache.get(caching._lock_key(self.key)))
+
+    def test_cold_miss_after_waiting_builds_and_stores(self):
+        cache.add(caching._lock_key(self.key), 1)
+        self.assertEqual(self.get(), 'new')
+        self.assertEqual(cache.get(self.key)['value'], 'new')
+
+    def test_early_expiry(self):
+        caching.store(self.key, 'old', timeout=1, build_time=10)
+        with mock.patch.object(caching.random, 'random', return_value=0.0):
+            self.assertEqual(self.get(), 'old')  # No jitter: still fresh
+        with mock.patch.object(caching.random, 'random', return_value=0.5):
+            self.assertEqual(self.get(), 'new')  # A slow build near expiry refreshes early
+        with override_settings(CACHE_EARLY_EXPIRY_BETA=0):
+            caching.store(self.key, 'old', timeout=1, build_time=10)
+            self.assertEqual(self.get(), 'old')
+
+
+class GradeExportTests(TestCase):
+    rows = [('=HYPERLINK("http://example.com")', '-1', 'Essay', 7)]
+
+    def test_csv_quotes_formulas(self):
+        lines = list(csv_stream(self.rows))
+        self.assertEqual(lines[1], '"\'=HYPERLINK(""http://example.com"")",\'-1,Essay,7\r\n')
+
+    @skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_xlsx_stores_formulas_as_text_without_a_quote(self):
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(xlsx_stream(self.rows)))).active
+        [cells] = sheet.iter_rows(min_row=2, max_col=len(self.rows[0]))
+        self.assertEqual([cell.value for cell in cells], list(self.rows[0]))
+        self.assertEqual([cell.data_type for cell in cells[:2]], ['s', 's'])
+        self.assertTrue(cells[0].quotePrefix)
+
+    def test_invalid_year_is_rejected(self):
+        teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        token = jwt.encode({'user_id': teacher.id, 'is_2fa_verified': True}, settings.SECRET_KEY, algorithm='HS256')
+        for url in ('/api/assignments', '/api/assignments/export'):
+            for year in ('²', 'abc', '99999'):
+                with self.subTest(url=url, year=year):
+                    response = self.client.get(url, {'year': year}, HTTP_AUTHORIZATION=f'Bearer {token}')
+                    self.assertEqual(response.status_code, 400)
+
+
+class PromotionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seven, eight = Grade.objects.create(level=7), Grade.objects.create(level=8)
+        cls.east = SchoolClass.objects.create(name='7 East', capacity=3, grade=seven)
+        cls.west = SchoolClass.objects.create(name='7 West', capacity=30, grade=seven)
+        cls.next_east = SchoolClass.objects.create(name='8 East', capacity=3, grade=eight)
+        cls.students = [
+            User.objects.create_user(f'student{index}@example.com', role='student', is_active=True, school_class=cls.east)
+            for index in range(3)
+        ]
+        cls.east.students.add(*cls.students)
+        cls.west.students.add(cls.students[0])
+        cls.repeater = User.objects.create_user('repeater@example.com', role='student', is_active=True)
+        cls.next_east.students.add(cls.repeater, cls.students[1])
+
+    def enrolled(self, school_class):
+        return set(school_class.students.values_list('email', flat=True))
+
+    def test_next_grade_mapping(self):
+        mapping, unmatched = next_grade_mapping(SchoolClass.objects.all())
+        self.assertEqual(mapping, {self.east.id: self.next_east.id, self.next_east.id: None})
+        self.assertEqual(unmatched, [self.west])
+
+    def test_dry_run_reports_without_writing(self):
+        [row] = promote({self.east.id: self.next_east.id}, dry_run=True)
+        self.assertEqual(row, {
+            'from': '7 East', 'to': '8 East', 'students': 3,
+            'resulting_size': 4, 'capacity': 3, 'over_capacity': True, 'merged_students': 0,
+        })
+        self.assertEqual(len(self.enrolled(self.east)), 3)
+
+    def test_students_already_in_the_destination_keep_one_enrollment(self):
+        promote({self.east.id: self.next_east.id})
+        self.assertEqual(self.enrolled(self.east), set())
+        self.assertEqual(
+            self.enrolled(self.next_east), {student.email for student in self.students} | {self.repeater.email}
+        )
+        self.assertEqual(User.objects.filter(school_class=self.next_east).count(), 3)
+
+    def test_graduation_clears_the_cohort(self):
+        promote({self.next_east.id: None})
+        self.assertEqual(self.enrolled(self.next_east), set())
+        self.assertEqual(self.enrolled(self.east), {student.email for student in self.students})
+
+    def test_moving_up_while_the_destination_graduates(self):
+        promote({self.east.id: self.next_east.id, self.next_east.id: None})
+        self.assertEqual(self.enrolled(self.next_east), {student.email for student in self.students})
+
+    def test_two_sources_merging_into_one_destination(self):
+        mapping = {self.east.id: self.next_east.id, self.west.id: self.next_east.id}
+        report = promote(mapping, dry_run=True)
+        self.assertEqual([row['merged_students'] for row in report], [1, 1])
+        self.assertEqual(report[0]['resulting_size'], 4)
+        promote(mapping)
+        self.assertEqual(Enrollment.objects.filter(schoolclass=self.next_east).count(), 4)
+        self.assertFalse(Enrollment.objects.filter(schoolclass_id__in=[self.east.id, self.west.id]).exists())
+
+
+class AssignmentCreateTests(TestCase):
+    url = '/api/assignments'
+
+    @classmethod
+    def setUpTestData(cls):
+        grade = Grade.objects.create(level=7)
+        cls.teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        TeacherSubject.objects.create(teacher=cls.teacher, subject='mathematics')
+        cls.classes = [SchoolClass.objects.create(name=f'7{name}', capacity=40, grade=grade) for name in 'ABC']
+        for school_class in cls.classes[:2]:
+            school_class.teachers.add(cls.teacher)
+
+    def post(self, **fields):
+        body = {'title': 'Fractions', 'subject': 'mathematics', 'due': '2030-01-01T09:00:00Z', **fields}
+        token = jwt.encode({'user_id': self.teacher.id, 'is_2fa_verified': True}, settings.SECRET_KEY, algorithm='HS256')
+        return self.client.post(
+            self.url, json.dumps(body), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def test_one_class(self):
+        response = self.post(classroom=self.classes[0].id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], 'Fractions')
+        self.assertEqual(Assignment.objects.get().classroom, self.classes[0])
+
+    def test_several_classes(self):
+        ids = [self.classes[0].id, self.classes[1].id, self.classes[0].id]
+        response = self.post(classrooms=ids)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['assignments']), 2)
+        self.assertEqual(
+            sorted(Assignment.objects.values_list('classroom_id', flat=True)), [self.classes[0].id, self.classes[1].id]
+        )
+
+    def test_invalid_requests_create_nothing(self):
+        for fields, status in (
+            ({'classrooms': []}, 400),
+            ({'classrooms': self.classes[0].id}, 400),
+            ({'classrooms': [self.classes[0].id, None]}, 400),
+            ({'classrooms': [self.classes[0].id, 999]}, 400),
+            ({'classroom': self.classes[0].id, 'title': ''}, 400),
+            ({'classrooms': [self.classes[0].id, self.classes[2].id]}, 403),
+            ({'classroom': self.classes[0].id, 'subject': 'english'}, 403),
+        ):
+            with self.subTest(fields=fields):
+                self.assertEqual(self.post(**fields).status_code, status)
+        self.assertFalse(Assignment.objects.exists())
+
+
+class PendingSubmissionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school_class = SchoolClass.objects.create(name='7A', capacity=40, grade=Grade.objects.create(level=7))
+        teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        cls.submitted, cls.pending = [
+            User.objects.create_user(f'student{index}@example.com', role='student', is_active=True) for index in range(2)
+        ]
+        inactive = User.objects.create_user('left@example.com', role='student', is_active=False)
+        school_class.students.add(cls.submitted, cls.pending, inactive)
+        cls.now = timezone.now()
+        cls.soon, cls.later = [
+            Assignment.objects.create(
+                title=title, due=cls.now + datetime.timedelta(hours=hours), created_by=teacher, classroom=school_class,
+            )
+            for title, hours in (('Soon', 2), ('Later', 48))
+        ]
+        Submission.objects.create(assignment=cls.soon, student=cls.submitted, file='soon.pdf')
+
+    def test_only_missing_submissions_in_the_window(self):
+        rows = pending_submissions(self.now, self.now + datetime.timedelta(hours=24))
+        self.assertEqual(
+            [(row['id'], row['student_id'], row['student_email']) for row in rows],
+            [(self.soon.id, self.pending.id, self.pending.email)],
+        )
+
+    def test_rows_group_by_student(self):
+        rows = pending_submissions(self.now, self.now + datetime.timedelta(days=3))
+        self.assertEqual(
+            [(row['student_id'], row['id']) for row in rows],
+            [(self.submitted.id, self.later.id), (self.pending.id, self.soon.id), (self.pending.id, self.later.id)],
+        )
+
+
+def essay(seed, words=300):
+    vocabulary = [f'word{index}' for index in range(2000)]
+    return ' '.join(random.Random(seed).choices(vocabulary, k=words))
+
+
+class SimilarityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school_class = SchoolClass.objects.create(name='7A', capacity=40, grade=Grade.objects.create(level=7))
+        teacher = User.objects.create_user('teacher@example.com', role='teacher', is_active=True)
+        cls.assignment = Assignment.objects.create(
+            title='Essay', due=timezone.now() + datetime.timedelta(days=1), created_by=teacher, classroom=school_class,
+        )
+        original = essay(1).split()
+        copied = original[:100] + ['changed'] + original[101:200] + ['changed'] + original[201:]
+        cls.texts = {'original.pdf': ' '.join(original), 'copy.pdf': ' '.join(copied), 'other.pdf': essay(2)}
+        cls.submissions = {}
+        for index, name in enumerate(['original.pdf', 'copy.pdf', 'other.pdf', 'original.pdf']):
+            student = User.objects.create_user(f'student{index}@example.com', role='student', is_active=True)
+            cls.submissions[index] = Submission.objects.create(assignment=cls.assignment, student=student, file=name)
+
+    def signature(self, field_file):
+        hashes = similarity.shingle_hashes(self.texts[field_file.name])
+        return similarity.minhash(hashes) if len(hashes) >= settings.SIMILARITY_MIN_SHINGLES else None
+
+    def flags(self):
+        return {
+            (flag.first_id, flag.second_id): round(flag.similarity, 1) for flag in SimilarityFlag.objects.all()
+        }
+
+    def test_signatures_estimate_similarity(self):
+        original, copy, other = (
+            similarity.minhash(similarity.shingle_hashes(self.texts[name])) for name in ('original.pdf', 'copy.pdf', 'other.pdf')
+        )
+        self.assertGreater(similarity.estimated_similarity(original, copy), settings.SIMILARITY_THRESHOLD)
+        self.assertLess(similarity.estimated_similarity(original, other), 0.1)
+        shared = set(enumerate(similarity.band_buckets(original))) & set(enumerate(similarity.band_buckets(copy)))
+        self.assertTrue(shared)
+
+    def test_short_texts_have_no_signature(self):
+        self.texts['original.pdf'] = 'too short to compare'
+        self.assertIsNone(self.signature(self.submissions[0].file))
+
+    def test_near_copies_and_identical_files_are_flagged(self):
+        with mock.patch.object(similarity, 'signature_for', self.signature):
+            for submission in self.submissions.values():
+                similarity.index_submission(submission)
+        first, copy, _, same_file = (submission.id for submission in self.submissions.values())
+        self.assertEqual(self.flags(), {(first, copy): 0.9, (first, same_file): 1.0, (copy, same_file): 0.9})
+        self.assertEqual(SubmissionBand.objects.count(), 4 * settings.SIMILARITY_BANDS)
+
+    def test_reindexing_replaces_flags(self):
+        with mock.patch.object(similarity, 'signature_for', self.signature):
+            for submission in list(self.submissions.values())[:2]:
+                similarity.index_submission(submission)
+            self.texts['copy.pdf'] = essay(3)
+            similarity.index_submission(self.submissions[1])
+        # Only the near copy's flag goes; the fourth submission shares the original's file.
+        self.assertEqual(self.flags(), {(self.submissions[0].id, self.submissions[3].id): 1.0})
+
+
+class RecurrenceTests(SimpleTestCase):
+    start = datetime.datetime(2025, 9, 1, 9, tzinfo=datetime.timezone.utc)  # A Monday
+
+    def event(self, recurrence, exceptions=()):
+        return Event(
+            title='Assembly', start=self.start, end=self.start + datetime.timedelta(hours=1),
+            recurrence=recurrence, recurrence_exceptions=list(exceptions),
+        )
+
+    def starts(self, event, days=28):
+        return [start for start, _ in occurrences(event, self.start, self.start + datetime.timedelta(days=days))]
+
+    def test_weekly_occurrences_in_window(self):
+        starts = self.starts(self.event('FREQ=WEEKLY;BYDAY=MO'))
+        self.assertEqual(starts, [self.start + datetime.timedelta(weeks=week) for week in range(4)])
+
+    def test_window_starts_mid_series(self):
+        event = self.event('FREQ=DAILY')
+        window_start = self.start + datetime.timedelta(days=10, minutes=30)  # Inside the tenth day's occurrence
+        found = list(occurrences(event, window_start, window_start + datetime.timedelta(days=1)))
+        self.assertEqual(found[0][0], self.start + datetime.timedelta(days=10))
+        self.assertEqual(len(found), 2)
+
+    def test_exceptions_skip_occurrences_naive_or_aware(self):
+        event = self.event('FREQ=WEEKLY', exceptions=['2025-09-08T09:00:00+00:00', '2025-09-15T09:00:00'])
+        with timezone.override(datetime.timezone.utc):
+            self.assertEqual(self.starts(event), [self.start, self.start + datetime.timedelta(weeks=3)])
+
+    def test_last_occurrence_end(self):
+        self.assertEqual(
+            last_occurrence_end(self.event('FREQ=DAILY;COUNT=3')), self.start + datetime.timedelta(days=2, hours=1)
+        )
+        self.assertEqual(
+            last_occurrence_end(self.event('FREQ=WEEKLY;UNTIL=20250915T090000Z')),
+            self.start + datetime.timedelta(weeks=2, hours=1),
+        )
+        self.assertIsNone(last_occurrence_end(self.event('FREQ=WEEKLY')))
+
+    def test_rejected_rules(self):
+        for recurrence in (
+            'FREQ=FORTNIGHTLY',
+            'RRULE:FREQ=WEEKLY\nEXDATE:20250908T090000Z',
+            'FREQ=HOURLY;COUNT=5',
+            'FREQ=MINUTELY',
+            'FREQ=SECONDLY;UNTIL=20260101T000000Z',
+        ):
+            with self.subTest(recurrence=recurrence), self.assertRaises(ValidationError):
+                self.event(recurrence).clean()
+
+    @override_settings(RECURRENCE_MAX_OCCURRENCES=10)
+    def test_series_length_is_capped(self):
+        self.event('FREQ=DAILY;COUNT=10').clean()
+        with self.assertRaises(ValidationError):
+            self.event('FREQ=DAILY;COUNT=11').clean()
+
+    def test_invalid_exception_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.event('FREQ=WEEKLY', exceptions=['next monday']).clean()
+
+    @override_settings(RECURRENCE_MAX_OCCURRENCES=10)
+    def test_expansion_of_stored_sub_daily_rules_is_capped(self):
+        self.assertEqual(len(self.starts(self.event('FREQ=MINUTELY'))), 10)
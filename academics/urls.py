@@ -1,12 +1,24 @@
 from django.urls import path
-from .views import calendar_events_view, assignment_view, announcements_view, classes_view
+from .views import (
+    calendar_events_view, assignment_view, announcements_view, classes_view, assignment_dashboard_view,
+    announcements_unread_view, announcements_read_view, home_view, sync_view,
+    similarity_flags_view, grade_export_view,
+)
 
 urlpatterns = [
+    path('home', home_view, name='home'),
     path('calendar-events', calendar_events_view, name='calendar_events'),
     path('announcements', announcements_view, name='announcements'),
+    path('announcements/unread-count', announcements_unread_view, name='announcements_unread'),
+    path('announcements/read', announcements_read_view, name='announcements_read'),
+    path('announcements/read-all', announcements_read_view, name='announcements_read_all'),
     path('assignments', assignment_view, name='assignment_view'),
     path('assignments/submit', assignment_view, name='assignment_submit'),
     path('assignments/submissions',assignment_view, name='assignment_submissions'),
     path('assignments/grade', assignment_view, name='assignment_grade'),
+    path('assignments/dashboard', assignment_dashboard_view, name='assignment_dashboard'),
+    path('assignments/similar', similarity_flags_view, name='assignment_similarity'),
+    path('assignments/export', grade_export_view, name='grade_export'),
     path('classes', classes_view, name='classes_view'),
+    path('sync', sync_view, name='sync'),
 ]
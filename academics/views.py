@@ -1,66 +1,268 @@
+import datetime
 import json
 
+from django.conf import settings
 from django.core.cache import cache
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.http.response import HttpResponseForbidden
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
-from .models import Event, Assignment, SchoolClass, TeacherSubject, Submission, Announcement
+from .archive import academic_year_bounds, current_academic_year, is_archived, live_listing_filter
+from .caching import (
+    bump_class_versions, cache_builder, classes_cache_key, classes_fingerprint, get_many_or_build, get_or_build,
+)
+from .export import export_response
+from .fieldsets import (
+    ANNOUNCEMENT_FIELDS, ASSIGNMENT_FIELDS, EVENT_COLUMNS, EVENT_FIELDS, SUBMISSION_STATUS_FIELDS,
+    columns, fields_key, parse_fields, serialize, wants,
+)
+from .models import (
+    Event, Assignment, SchoolClass, TeacherSubject, Submission, Announcement, ArchivedAssignment, ArchivedSubmission,
+    SimilarityFlag,
+)
+from .read_state import mark_all_read, mark_read, unread_count
+from .recurrence import occurrences
+from .sync import changes_since, user_class_ids
 import logging
 
 logger = logging.getLogger(__name__)
 
-@csrf_exempt
-def calendar_events_view(request):
-    cache_key = 'calendar_events'
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return JsonResponse(cached_data, safe=False)
+# Freshness of the shared payloads, in seconds; the standalone views and home_view
+# read the same keys, so they must agree.
+CALENDAR_CACHE_TIMEOUT = 600
+ANNOUNCEMENTS_CACHE_TIMEOUT = 600
+ASSIGNMENTS_CACHE_TIMEOUT = 300
+CLASSES_CACHE_TIMEOUT = 300
 
-    events = Event.objects.select_related('school_class').all()
-    events_data = [
-        {
-            'title': event.title,
-            'description': event.description,
-            'start': event.start.isoformat(),
-            'end': event.end.isoformat(),
-            'school_class': event.school_class.name if event.school_class else None,
-            'allDay': event.allDay
-        }
+
+def _window_bound(request, name, default):
+    value = request.GET.get(name)
+    if not value:
+        return default
+    parsed = parse_datetime(value)  # Raises ValueError itself for out-of-range fields
+    if parsed is None:
+        raise ValueError(f"Invalid {name}: expected an ISO 8601 datetime")
+    return parsed
+
+
+def _year_param(request):
+    """The ``year`` query parameter as an int, or None. Raises ValueError when it is not a usable year."""
+    value = request.GET.get('year')
+    if value is None:
+        return None
+    year = int(value)  # Not str.isdigit(): that accepts characters such as '²'
+    if not datetime.MINYEAR <= year < datetime.MAXYEAR:
+        raise ValueError("Year out of range")
+    return year
+
+
+def calendar_window(request):
+    """Parse ``start``/``end`` query parameters into a bounded window; defaults to the surrounding year.
+
+    Raises ValueError for unparseable bounds, an empty or inverted window, or one
+    longer than CALENDAR_MAX_WINDOW_DAYS.
+    """
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = _window_bound(request, 'start', today - datetime.timedelta(days=settings.CALENDAR_DEFAULT_DAYS))
+    end = _window_bound(request, 'end', today + datetime.timedelta(days=settings.CALENDAR_DEFAULT_DAYS))
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if end <= start or end - start > datetime.timedelta(days=settings.CALENDAR_MAX_WINDOW_DAYS):
+        raise ValueError(f"Calendar window must be positive and at most {settings.CALENDAR_MAX_WINDOW_DAYS} days")
+    return start, end
+
+
+@cache_builder('calendar_events')
+def calendar_events_payload(start, end, fields=None):
+    return build_calendar_events(parse_datetime(start), parse_datetime(end), fields)
+
+
+def build_calendar_events(start, end, fields=None):
+    # One-off events are filtered by overlap; recurring ones by the span of their series,
+    # and are then expanded only inside the window.
+    events = Event.objects.filter(
+        Q(start__lt=end) & (Q(recurrence_end__gt=start) | Q(recurrence_end__isnull=True))
+    ).only(*columns(EVENT_FIELDS, fields, always=EVENT_COLUMNS))
+    if wants(fields, 'school_class'):
+        events = events.select_related('school_class')
+    occurrences_in_window = [
+        (event, occurrence_start, occurrence_end)
         for event in events
+        for occurrence_start, occurrence_end in occurrences(event, start, end)
     ]
-    cache.set(cache_key, events_data, timeout=600)  # Cache for 10 minutes
+    occurrences_in_window.sort(key=lambda occurrence: occurrence[1])
+    return [serialize(EVENT_FIELDS, occurrence, fields) for occurrence in occurrences_in_window]
+
+
+def calendar_events_cache_key(start, end, fields=None):
+    return f'calendar_events_{start.isoformat()}_{end.isoformat()}' + fields_key(fields)
+
+
+@csrf_exempt
+def calendar_events_view(request):
+    try:
+        start, end = calendar_window(request)
+        fields = parse_fields(request.GET.get('fields'), EVENT_FIELDS)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    events_data = get_or_build(
+        'calendar_events', start.isoformat(), end.isoformat(), fields,
+        key=calendar_events_cache_key(start, end, fields), timeout=CALENDAR_CACHE_TIMEOUT, background=True,
+    )
     return JsonResponse(events_data, safe=False)
 
-def announcements_view(request):
-    cache_key = 'announcements'
-    cached_data = cache.get(cache_key)
-    if cached_data is not None:
-        return JsonResponse(cached_data, safe=False)
+@cache_builder('announcements')
+def build_announcements(fields=None):
+    announcements = Announcement.objects.only(*columns(ANNOUNCEMENT_FIELDS, fields))
+    return [serialize(ANNOUNCEMENT_FIELDS, announcement, fields) for announcement in announcements]
 
-    announcements = Announcement.objects.select_related('school_class').all()
-    announcements_data = [
-        {
-            'title': announcement.title,
-            'description': announcement.description,
-            'date': announcement.date.isoformat(),
-            'target_role': announcement.target_role,
-            'school_class': announcement.school_class.id if announcement.school_class else None,
-        }
-        for announcement in announcements
-    ]
-    cache.set(cache_key, announcements_data, timeout=600)
+
+def announcements_view(request):
+    try:
+        fields = parse_fields(request.GET.get('fields'), ANNOUNCEMENT_FIELDS)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    announcements_data = get_or_build(
+        'announcements', fields, key='announcements' + fields_key(fields), timeout=ANNOUNCEMENTS_CACHE_TIMEOUT,
+        background=True,
+    )
     return JsonResponse(announcements_data, safe=False)
 
 
+@require_http_methods(["GET"])
+def announcements_unread_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    return JsonResponse({'unread': unread_count(request.user)})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def announcements_read_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if request.path.endswith('/read-all'):
+        mark_all_read(request.user)
+        return JsonResponse({'unread': 0})
+
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object")
+        announcement_id = int(payload.get('id'))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return HttpResponseBadRequest("Missing or invalid announcement id")
+    if not mark_read(request.user, announcement_id):
+        return HttpResponseBadRequest("Invalid announcement ID")
+    return JsonResponse({'unread': unread_count(request.user)})
+
+
+def assignments_cache_key(user, year=None, fields=None, fingerprint=None):
+    # Keyed on the versions of the user's classes, so creating, submitting or promoting
+    # retires every variant (per year and field set) for everyone in those classes.
+    # Pass the classes_fingerprint() when the caller already has one.
+    prefix = f'assignments_{user.id}_{user.role}' + (f'_{year}' if year else '') + fields_key(fields)
+    return f"{prefix}_{fingerprint or classes_fingerprint(user_class_ids(user))}"
+
+
+@cache_builder('assignments')
+def build_assignments(user, year=None, fields=None):
+    """Assignment payload for a teacher or student; None when a student has no class.
+
+    Without ``year``, live assignments are listed except for years already archived
+    (open ones always stay). A past ``year`` is served read-only from the archive
+    tables once archived, and from the live tables until then. ``fields`` narrows each item.
+    """
+    if year is None:
+        assignments = Assignment.objects.filter(live_listing_filter())
+        submissions = Submission.objects.all()
+    elif is_archived(year):
+        assignments = ArchivedAssignment.objects.filter(academic_year=year)
+        submissions = ArchivedSubmission.objects.all()
+    else:
+        start, end = academic_year_bounds(year)
+        assignments = Assignment.objects.filter(created_at__gte=start, created_at__lt=end)
+        submissions = Submission.objects.all()
+
+    assignments = assignments.only(*columns(ASSIGNMENT_FIELDS, fields)).order_by('-created_at')
+    if user.role == "teacher":
+        assignments = assignments.filter(created_by=user)
+    else:
+        student_class = SchoolClass.objects.filter(students=user).first()
+        if not student_class:
+            return None
+        assignments = assignments.filter(classroom=student_class)
+        if any(wants(fields, name) for name in SUBMISSION_STATUS_FIELDS):
+            own_submissions = submissions.filter(student=user).only('id', 'assignment', 'status', 'score')
+            assignments = assignments.prefetch_related(
+                Prefetch('submissions', queryset=own_submissions, to_attr='own_submissions')
+            )
+
+    data = []
+    for assignment in assignments:
+        item = serialize(ASSIGNMENT_FIELDS, assignment, fields)
+        if hasattr(assignment, 'own_submissions'):
+            submission = assignment.own_submissions[0] if assignment.own_submissions else None
+            if wants(fields, 'submission_status'):
+                item['submission_status'] = submission.status if submission else None
+            if wants(fields, 'submission_score'):
+                item['submission_score'] = submission.score if submission else None
+        data.append(item)
+    return {'assignments': data}
+
+
+def user_classes_cache_key(user, fingerprint=None):
+    # Keyed on the user's class ids and versions: joining or leaving a class changes
+    # the set, and renames or membership edits bump the versions (academics.signals).
+    return f"classes_{user.id}_{user.role}_{fingerprint or classes_fingerprint(user_class_ids(user))}"
+
+
+@cache_builder('classes')
+def build_classes(user):
+    if user.role == "teacher":
+        classes = SchoolClass.objects.filter(teachers=user)
+    else:
+        classes = SchoolClass.objects.filter(students=user)
+    return [{'id': cls.id, 'name': cls.name} for cls in classes]
+
+
+SUBMISSIONS_PAGE_SIZE = 50
+SUBMISSIONS_MAX_PAGE_SIZE = 200
+
+
+def encode_submissions_cursor(submission):
+    position = [submission.status, submission.submitted_at.isoformat(), submission.id]
+    return urlsafe_base64_encode(json.dumps(position).encode())
+
+
+def decode_submissions_cursor(cursor):
+    """Keyset position (status, submitted_at, id) of the last row on the previous page."""
+    if not cursor:
+        return None
+    status, submitted_at, submission_id = json.loads(urlsafe_base64_decode(cursor))
+    submitted_at = parse_datetime(submitted_at)
+    if submitted_at is None:
+        raise ValueError("Invalid cursor timestamp")
+    return str(status), submitted_at, int(submission_id)
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def assignment_view(request):
-    logger.info(f"User role: {request.user.role}")
     if not request.user.is_authenticated:
+        # Anonymous traffic can be heavy; keep it out of the INFO stream.
+        logger.debug("Assignment %s %s rejected: not authenticated", request.method, request.path)
         return JsonResponse({"error": "Authentication required"}, status=401)
+    logger.info("Assignment %s %s by %s %s", request.method, request.path, request.user.role, request.user.id)
 
     if request.method == "GET":
         if 'submission' in request.path:
@@ -69,71 +271,75 @@ def assignment_view(request):
             assignment_id = request.GET.get('assignment_id')
             if not assignment_id:
                 return HttpResponseBadRequest("Missing assignment_id")
-            try:
-                assignment = Assignment.objects.get(id=assignment_id, created_by=request.user)
-                submissions = assignment.submissions.all()
-                data = [
-                    {
-                        'id': sub.id,
-                        'student': sub.student.first_name + " " + sub.student.last_name,
-                        'file': sub.file.url,
-                        'submitted_at': sub.submitted_at.isoformat(),
-                        'status': sub.status,
-                        'score': sub.score,
-                    }
-                    for sub in submissions
-                ]
-                return JsonResponse({'submissions': data})
-            except Assignment.DoesNotExist:
+            if not Assignment.objects.filter(id=assignment_id, created_by=request.user).exists():
                 return HttpResponseBadRequest("Invalid assignment ID or not your assignment")
 
-        cache_key = f'assignments_{request.user.id}_{request.user.role}'
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return JsonResponse(cached_data)
-
-        if request.user.role == "teacher":
-            assignments = Assignment.objects.filter(created_by=request.user).select_related('classroom').order_by('-created_at')
-        elif request.user.role == "student":
-            student_class = SchoolClass.objects.filter(students=request.user).first()
-            if not student_class:
-                return JsonResponse({"error": "No class assigned to this student"}, status=404)
-            assignments = Assignment.objects.filter(classroom=student_class).select_related('classroom').order_by('-created_at')
-            data = []
-            for assignment in assignments:
-                submission = assignment.submissions.filter(student=request.user).first()
-                data.append({
-                    'id': assignment.id,
-                    'subject': assignment.subject,
-                    'title': assignment.title,
-                    'description': assignment.description,
-                    'due': assignment.due.isoformat(),
-                    'status': assignment.status,
-                    'classroom': assignment.classroom.id if assignment.classroom else None,
-                    'created_at': assignment.created_at.isoformat(),
-                    'submission_status': submission.status if submission else None,
-                    'submission_score': submission.score if submission else None,
-                })
-            cache.set(cache_key, {'assignments': data}, timeout=300)
-            return JsonResponse({'assignments': data})
-        else:
-            return HttpResponseForbidden("Invalid role")
+            status = request.GET.get('status')
+            if status and status not in dict(Submission.STATUS_CHOICES):
+                return HttpResponseBadRequest("Invalid status filter")
+            try:
+                limit = min(int(request.GET.get('limit', SUBMISSIONS_PAGE_SIZE)), SUBMISSIONS_MAX_PAGE_SIZE)
+                if limit < 1:
+                    raise ValueError("limit must be positive")
+                after = decode_submissions_cursor(request.GET.get('cursor'))
+            except (TypeError, ValueError):
+                return HttpResponseBadRequest("Invalid limit or cursor")
 
-        data = [
-            {
-                'id': assignment.id,
-                'subject': assignment.subject,
-                'title': assignment.title,
-                'description': assignment.description,
-                'due': assignment.due.isoformat(),
-                'status': assignment.status,
-                'classroom': assignment.classroom.id if assignment.classroom else None,
-                'created_at': assignment.created_at.isoformat(),
-            }
-            for assignment in assignments
-        ]
-        cache.set(cache_key, {'assignments': data}, timeout=300)
-        return JsonResponse({'assignments': data})
+            # 'submitted' sorts after 'graded', so descending status puts ungraded work first.
+            submissions = (
+                Submission.objects.filter(assignment_id=assignment_id)
+                .select_related('student')
+                .only('id', 'file', 'submitted_at', 'status', 'score', 'thumbnail', 'page_count',
+                      'student__first_name', 'student__last_name')
+                .order_by('-status', 'submitted_at', 'id')
+            )
+            if status:
+                submissions = submissions.filter(status=status)
+            if after:
+                after_status, after_submitted_at, after_id = after
+                submissions = submissions.filter(
+                    Q(status__lt=after_status)
+                    | Q(status=after_status, submitted_at__gt=after_submitted_at)
+                    | Q(status=after_status, submitted_at=after_submitted_at, id__gt=after_id)
+                )
+            page = list(submissions[:limit + 1])
+            data = [
+                {
+                    'id': sub.id,
+                    'student': sub.student.first_name + " " + sub.student.last_name,
+                    'file': sub.file.url,
+                    'submitted_at': sub.submitted_at.isoformat(),
+                    'status': sub.status,
+                    'score': sub.score,
+                    'thumbnail': sub.thumbnail.url if sub.thumbnail else None,
+                    'page_count': sub.page_count,
+                }
+                for sub in page[:limit]
+            ]
+            next_cursor = encode_submissions_cursor(page[limit - 1]) if len(page) > limit else None
+            return JsonResponse({'submissions': data, 'next_cursor': next_cursor})
+
+        try:
+            year = _year_param(request)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid year")
+        if year is not None and year >= current_academic_year():
+            year = None
+
+        if request.user.role not in ("teacher", "student"):
+            return HttpResponseForbidden("Invalid role")
+        available = ASSIGNMENT_FIELDS if request.user.role == "teacher" else [*ASSIGNMENT_FIELDS, *SUBMISSION_STATUS_FIELDS]
+        try:
+            fields = parse_fields(request.GET.get('fields'), available)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        data = get_or_build(
+            'assignments', request.user, year, fields,
+            key=assignments_cache_key(request.user, year, fields), timeout=ASSIGNMENTS_CACHE_TIMEOUT,
+        )
+        if data is None:
+            return JsonResponse({"error": "No class assigned to this student"}, status=404)
+        return JsonResponse(data)
 
     elif request.method == "POST":
         # Handle teacher creating assignment (for /api/assignments)
@@ -145,41 +351,49 @@ def assignment_view(request):
                 title = body.get('title')
                 description = body.get('description', '')
                 subject = body.get('subject')
-                classroom_id = body.get('classroom')
+                # One class as ``classroom``, or the same assignment for several as ``classrooms``
+                many = 'classrooms' in body
+                classroom_ids = body.get('classrooms') if many else [body.get('classroom')]
                 due = parse_datetime(body.get('due'))
 
-                if not all([title, due, classroom_id, subject]):
+                if not all([title, due, subject]) or not isinstance(classroom_ids, list) or not all(classroom_ids):
+                    return HttpResponseBadRequest("Missing required fields: title, due, classroom, or subject")
+                classroom_ids = list(dict.fromkeys(int(classroom_id) for classroom_id in classroom_ids))
+                if not classroom_ids:
                     return HttpResponseBadRequest("Missing required fields: title, due, classroom, or subject")
 
-                classroom = SchoolClass.objects.get(id=classroom_id)
-                if request.user not in classroom.teachers.all():
+                # Class membership and the subject check come back with the classes in one query.
+                classes = list(
+                    SchoolClass.objects.filter(id__in=classroom_ids).annotate(
+                        teaches_class=Exists(SchoolClass.teachers.through.objects.filter(
+                            schoolclass_id=OuterRef('pk'), user_id=request.user.id
+                        )),
+                        teaches_subject=Exists(TeacherSubject.objects.filter(teacher=request.user, subject=subject)),
+                    ).only('id')
+                )
+                if len(classes) != len(classroom_ids):
+                    return HttpResponseBadRequest("Invalid classroom ID")
+                if not all(cls.teaches_class for cls in classes):
                     return HttpResponseForbidden("You are not assigned to this class")
-                if not TeacherSubject.objects.filter(teacher=request.user, subject=subject).exists():
+                if not classes[0].teaches_subject:
                     return HttpResponseForbidden("You are not assigned to teach this subject")
 
-                assignment = Assignment.objects.create(
-                    title=title,
-                    description=description,
-                    subject=subject,
-                    classroom=classroom,
-                    due=due,
-                    created_by=request.user,
-                )
-                data = {
-                    'id': assignment.id,
-                    'subject': assignment.subject,
-                    'title': assignment.title,
-                    'description': assignment.description,
-                    'due': assignment.due.isoformat(),
-                    'status': assignment.status,
-                    'classroom': assignment.classroom.id,
-                    'created_at': assignment.created_at.isoformat(),
-                }
-                return JsonResponse(data, status=201)
+                assignments = Assignment.objects.bulk_create([
+                    Assignment(
+                        title=title,
+                        description=description,
+                        subject=subject,
+                        classroom_id=classroom_id,
+                        due=due,
+                        created_by=request.user,
+                    )
+                    for classroom_id in classroom_ids
+                ])
+                bump_class_versions(*classroom_ids)
+                data = [serialize(ASSIGNMENT_FIELDS, assignment, None) for assignment in assignments]
+                return JsonResponse({'assignments': data} if many else data[0], status=201)
             except json.JSONDecodeError:
                 return HttpResponseBadRequest("Invalid JSON format")
-            except SchoolClass.DoesNotExist:
-                return HttpResponseBadRequest("Invalid classroom ID")
             except Exception as e:
                 return HttpResponseBadRequest(str(e))
 
@@ -218,20 +432,187 @@ def assignment_view(request):
             except Exception as e:
                 return HttpResponseBadRequest(str(e))
 
-@csrf_exempt
 @require_http_methods(["GET"])
-def classes_view(request):
+def assignment_dashboard_view(request):
     if not request.user.is_authenticated:
-        return HttpResponseForbidden("Authentication required")
+        return JsonResponse({"error": "Authentication required"}, status=401)
     if request.user.role != "teacher":
-        return HttpResponseForbidden("Only teachers can view classes")
+        return HttpResponseForbidden("Only teachers can view the assignment dashboard")
+
+    # Keyed on the classes the counted assignments belong to, whose versions move on
+    # with every assignment or submission change (academics.signals).
+    class_ids = set(
+        Assignment.objects.filter(created_by=request.user, classroom__isnull=False).values_list('classroom_id', flat=True)
+    )
+    cache_key = classes_cache_key(f'assignment_dashboard_{request.user.id}', class_ids)
+    cached_data = cache.get(cache_key)
+    if cached_data is not None:
+        return JsonResponse(cached_data)
+
+    # Class size comes from the enrollment table as a correlated subquery, so the
+    # submission counts below are not multiplied by the number of students.
+    enrollment = SchoolClass.students.through.objects.filter(
+        schoolclass_id=OuterRef('classroom_id')
+    ).order_by().values('schoolclass_id').annotate(total=Count('user_id')).values('total')
+    assignments = (
+        Assignment.objects.filter(created_by=request.user)
+        .select_related('classroom')
+        .annotate(
+            class_size=Subquery(enrollment, output_field=IntegerField()),
+            submitted=Count('submissions', filter=Q(submissions__status='submitted')),
+            graded=Count('submissions', filter=Q(submissions__status='graded')),
+        )
+        .order_by('-created_at')
+    )
+    data = []
+    for assignment in assignments:
+        class_size = assignment.class_size or 0
+        data.append({
+            'id': assignment.id,
+            'subject': assignment.subject,
+            'title': assignment.title,
+            'due': assignment.due.isoformat(),
+            'status': assignment.status,
+            'classroom': assignment.classroom.id if assignment.classroom else None,
+            'classroom_name': assignment.classroom.name if assignment.classroom else None,
+            'class_size': class_size,
+            'submitted': assignment.submitted,
+            'graded': assignment.graded,
+            'missing': max(class_size - assignment.submitted - assignment.graded, 0),
+        })
+    cache.set(cache_key, {'assignments': data}, timeout=ASSIGNMENTS_CACHE_TIMEOUT)
+    return JsonResponse({'assignments': data})
+
+@require_http_methods(["GET"])
+def grade_export_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if request.user.role != "teacher" and not request.user.is_staff:
+        return HttpResponseForbidden("Only teachers and staff can export grades")
 
-    classes = SchoolClass.objects.filter(teachers=request.user)
+    # Teachers get their own assignments; staff may export the whole school. A past,
+    # archived ``year`` is read from the archive tables, which share the column names.
+    try:
+        year = _year_param(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid year")
+    if year is not None and is_archived(year):
+        submissions = ArchivedSubmission.objects.filter(academic_year=year)
+    else:
+        submissions = Submission.objects.all()
+    if not request.user.is_staff:
+        submissions = submissions.filter(assignment__created_by=request.user)
+    filters = {
+        'assignment_id': 'assignment_id',
+        'classroom': 'assignment__classroom_id',
+        'subject': 'assignment__subject',
+    }
+    try:
+        for param, lookup in filters.items():
+            if request.GET.get(param):
+                submissions = submissions.filter(**{lookup: request.GET[param]})
+        return export_response(submissions, request.GET.get('format', 'csv'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+
+@require_http_methods(["GET"])
+def similarity_flags_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if request.user.role != "teacher":
+        return HttpResponseForbidden("Only teachers can view similarity flags")
+    assignment_id = request.GET.get('assignment_id')
+    if not assignment_id:
+        return HttpResponseBadRequest("Missing assignment_id")
+    if not Assignment.objects.filter(id=assignment_id, created_by=request.user).exists():
+        return HttpResponseBadRequest("Invalid assignment ID or not your assignment")
+
+    flags = (
+        SimilarityFlag.objects.filter(assignment_id=assignment_id)
+        .select_related('first__student', 'second__student')
+        .only('similarity', 'flagged_at', 'first__student__first_name', 'first__student__last_name',
+              'second__student__first_name', 'second__student__last_name')
+        .order_by('-similarity', 'id')
+    )
     data = [
         {
-            'id': cls.id,
-            'name': cls.name,
+            'submissions': [flag.first_id, flag.second_id],
+            'students': [
+                flag.first.student.first_name + " " + flag.first.student.last_name,
+                flag.second.student.first_name + " " + flag.second.student.last_name,
+            ],
+            'similarity': round(flag.similarity, 3),
+            'flagged_at': flag.flagged_at.isoformat(),
         }
-        for cls in classes
+        for flag in flags
     ]
+    return JsonResponse({'flags': data})
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def classes_view(request):
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden("Authentication required")
+    if request.user.role != "teacher":
+        return HttpResponseForbidden("Only teachers can view classes")
+
+    data = get_or_build('classes', request.user, key=user_classes_cache_key(request.user), timeout=CLASSES_CACHE_TIMEOUT)
     return JsonResponse({'classes': data})
+
+
+@require_http_methods(["GET"])
+def home_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if request.user.role not in ("teacher", "student"):
+        return HttpResponseForbidden("Invalid role")
+
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    events_start, events_end = today, today + datetime.timedelta(days=settings.HOME_UPCOMING_EVENT_DAYS)
+    # One class-id query and one version read key both per-user payloads.
+    fingerprint = classes_fingerprint(user_class_ids(request.user))
+    # The shared payloads refresh in Celery as in their own views; the per-user ones
+    # take a User argument, which the task cannot be handed, so they rebuild inline.
+    specs = {
+        calendar_events_cache_key(events_start, events_end): (
+            'calendar_events', (events_start.isoformat(), events_end.isoformat()), CALENDAR_CACHE_TIMEOUT, True
+        ),
+        'announcements': ('announcements', (), ANNOUNCEMENTS_CACHE_TIMEOUT, True),
+        assignments_cache_key(request.user, fingerprint=fingerprint): (
+            'assignments', (request.user,), ASSIGNMENTS_CACHE_TIMEOUT, False
+        ),
+        user_classes_cache_key(request.user, fingerprint): ('classes', (request.user,), CLASSES_CACHE_TIMEOUT, False),
+    }
+    # One round trip for every payload; only missing or expiring entries are rebuilt.
+    payloads = get_many_or_build(specs)
+    events, announcements, assignments, classes = (payloads[key] for key in specs)
+
+    class_ids = {cls['id'] for cls in classes}
+    class_names = {cls['name'] for cls in classes}
+    return JsonResponse({
+        'events': [event for event in events if event['school_class'] is None or event['school_class'] in class_names],
+        'announcements': [
+            announcement for announcement in announcements
+            if announcement['target_role'] in ('both', request.user.role)
+            and (announcement['school_class'] is None or announcement['school_class'] in class_ids)
+        ],
+        'assignments': [
+            assignment for assignment in (assignments or {'assignments': []})['assignments']
+            if assignment['status'] == 'pending'
+        ],
+        'classes': classes,
+    })
+
+
+@require_http_methods(["GET"])
+def sync_view(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if request.user.role not in ("teacher", "student"):
+        return HttpResponseForbidden("Invalid role")
+    try:
+        payload = changes_since(request.user, request.GET.get('cursor'))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    return JsonResponse(payload)
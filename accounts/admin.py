@@ -1,10 +1,18 @@
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.html import format_html
 
-from academics.models import Grade, SchoolClass, Announcement, Event, Assignment, TeacherSubject
+from academics.export import export_response
+from academics.models import (
+    Grade, SchoolClass, Announcement, Event, Assignment, Submission, TeacherSubject,
+    ArchivedAssignment, ArchivedSubmission,
+)
+from academics.promotion import next_grade_mapping, promote
+from accounts.models import RequestProfile
 
 User = get_user_model()
 
@@ -90,6 +98,7 @@ class SchoolClassAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_select_related = ('grade', 'supervisor')
     filter_horizontal = ('teachers', 'students')
+    actions = ['preview_promotion', 'promote_to_next_grade']
 
     def supervisor_name(self, obj):
         return obj.supervisor.email if obj.supervisor else 'None'
@@ -107,18 +116,54 @@ class SchoolClassAdmin(admin.ModelAdmin):
         cache.set(cache_key, qs, timeout=300)
         return qs
 
+    def _promote(self, request, queryset, dry_run):
+        mapping, unmatched = next_grade_mapping(queryset)
+        for cls in unmatched:
+            self.message_user(request, f"No class found in the next grade for {cls.name}; skipped", messages.WARNING)
+        for row in promote(mapping, dry_run=dry_run):
+            if row['to'] is None:
+                text = f"{row['from']}: {row['students']} students graduate"
+            else:
+                text = f"{row['from']} → {row['to']}: {row['students']} students ({row['resulting_size']}/{row['capacity']})"
+            level = messages.WARNING if row.get('over_capacity') else messages.INFO
+            self.message_user(request, ("Dry run – " if dry_run else "") + text, level)
+
+    def preview_promotion(self, request, queryset):
+        self._promote(request, queryset, dry_run=True)
+    preview_promotion.short_description = "Preview promotion to next grade (dry run)"
+
+    def promote_to_next_grade(self, request, queryset):
+        self._promote(request, queryset, dry_run=False)
+    promote_to_next_grade.short_description = "Promote selected classes to next grade"
+
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ('title', 'subject', 'due', 'status', 'classroom_name', 'created_by_email')
     list_filter = ('subject', 'status', 'due')
     search_fields = ('title',)
     list_select_related = ('classroom', 'created_by')
     date_hierarchy = 'due'
+    actions = ['export_grades_csv', 'export_grades_xlsx']
 
     def classroom_name(self, obj):
         return obj.classroom.name if obj.classroom else 'None'
     def created_by_email(self, obj):
         return obj.created_by.email
 
+    def _export_grades(self, request, queryset, file_format):
+        submissions = Submission.objects.filter(assignment_id__in=queryset.values('id'))
+        try:
+            return export_response(submissions, file_format)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+
+    def export_grades_csv(self, request, queryset):
+        return self._export_grades(request, queryset, 'csv')
+    export_grades_csv.short_description = "Export grades of selected assignments (CSV)"
+
+    def export_grades_xlsx(self, request, queryset):
+        return self._export_grades(request, queryset, 'xlsx')
+    export_grades_xlsx.short_description = "Export grades of selected assignments (XLSX)"
+
     def get_queryset(self, request):
         cache_key = 'assignment_admin_queryset'
         cached_qs = cache.get(cache_key)
@@ -149,10 +194,70 @@ class EventAdmin(admin.ModelAdmin):
         return obj.school_class.name if obj.school_class else 'None'
     school_class_name.short_description = 'School Class'
 
+class ArchivedAssignmentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'academic_year', 'subject', 'due', 'classroom', 'created_by')
+    list_filter = ('academic_year', 'subject')
+    search_fields = ('title',)
+    list_select_related = ('classroom', 'created_by')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ArchivedSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('assignment', 'student', 'academic_year', 'status', 'score', 'submitted_at')
+    list_filter = ('academic_year', 'status')
+    list_select_related = ('assignment', 'student')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'url_name', 'status_code', 'duration_ms', 'query_count', 'samples', 'user')
+    list_filter = ('url_name', 'method')
+    list_select_related = ('user',)
+    fields = ('created_at', 'method', 'path', 'url_name', 'user', 'status_code', 'duration_ms', 'samples', 'stacks', 'query_plans')
+    readonly_fields = fields
+    actions = ['download_folded_stacks']
+
+    def query_count(self, obj):
+        return len(obj.queries)
+
+    def stacks(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.folded_stacks)
+
+    def query_plans(self, obj):
+        text = '\n\n'.join(
+            f"[{query['time_ms']} ms] {query['sql']}\n{query.get('explain', '')}" for query in obj.queries
+        )
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', text)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def download_folded_stacks(self, request, queryset):
+        # Concatenated collapsed stacks; feed to flamegraph.pl or drop into speedscope.
+        body = '\n'.join(profile.folded_stacks for profile in queryset)
+        response = HttpResponse(body, content_type='text/plain')
+        response['Content-Disposition'] = 'attachment; filename="profile.folded"'
+        return response
+    download_folded_stacks.short_description = "Download flame graph stacks"
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Grade)
 admin.site.register(SchoolClass, SchoolClassAdmin)
 admin.site.register(Announcement, AnnouncementAdmin)
 admin.site.register(Event, EventAdmin)
 admin.site.register(Assignment, AssignmentAdmin)
-admin.site.register(TeacherSubject)
\ No newline at end of file
+admin.site.register(TeacherSubject)
+admin.site.register(RequestProfile, RequestProfileAdmin)
+admin.site.register(ArchivedAssignment, ArchivedAssignmentAdmin)
+admin.site.register(ArchivedSubmission, ArchivedSubmissionAdmin)
\ No newline at end of file
@@ -1,12 +1,20 @@
 # accounts/middleware.py
 import jwt
 import logging
+import threading
+import time
+from contextlib import ExitStack
+
 from django.conf import settings
+from django.db import connections
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 
+from educ_backend import log, metrics, routers
+from educ_backend.profiling import QueryCapture, SamplingProfiler
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -30,7 +38,8 @@ class SimpleJWTMiddleware(MiddlewareMixin):
         token = auth_header.split(" ", 1)[1]
 
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            with metrics.timed('jwt_time'):
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
             user_id = payload.get("user_id")
             is_2fa_verified = payload.get("is_2fa_verified", False)
             if not user_id:
@@ -38,6 +47,8 @@ class SimpleJWTMiddleware(MiddlewareMixin):
             if not is_2fa_verified:
                 return JsonResponse({"error": "2FA verification required"}, status=403)
 
+            if routers.is_pinned(user_id):
+                routers.use_primary()
             user = User.objects.get(pk=user_id)
             request.user = user
         except jwt.ExpiredSignatureError:
@@ -47,4 +58,106 @@ class SimpleJWTMiddleware(MiddlewareMixin):
         except User.DoesNotExist:
             return JsonResponse({"error": "User not found"}, status=401)
 
-        return None
\ No newline at end of file
+        return None
+
+
+class PerformanceMetricsMiddleware:
+    # Sits first in MIDDLEWARE so every other middleware is inside the measurement.
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_json_responses()
+
+    def __call__(self, request):
+        request_metrics, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match and match.url_name else 'unresolved'
+        metrics.observe(url_name, request_metrics, total)
+        response['Server-Timing'] = request_metrics.server_timing(total)
+        return response
+
+
+class RequestIdMiddleware:
+    # Tags every log record written while serving the request with its id.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id, token = log.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            log.end_request(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    # Must come before SimpleJWTMiddleware so the user lookup can be served by a replica.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.begin_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        user = getattr(request, 'user', None)
+        if wrote and user is not None and user.is_authenticated:
+            routers.pin_user(user.id)
+        return response
+
+
+class RequestProfilerMiddleware:
+    # Runs after SimpleJWTMiddleware so request.user is known. Staff opt in per request
+    # with an ``X-Profile: 1`` header or a ``_profile=1`` query parameter.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'
+        user = getattr(request, 'user', None)
+        if not requested or not (user and user.is_authenticated and user.is_staff):
+            return self.get_response(request)
+
+        from accounts.models import RequestProfile
+
+        captures = [QueryCapture(connection.alias) for connection in connections.all()]
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection, capture in zip(connections.all(), captures):
+                stack.enter_context(connection.execute_wrapper(capture))
+            profiler = stack.enter_context(
+                SamplingProfiler(threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL)
+            )
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        queries = []
+        for capture in captures:
+            queries.extend(capture.explain(limit=settings.PROFILER_MAX_EXPLAINS))
+        match = getattr(request, 'resolver_match', None)
+        profile = RequestProfile.objects.create(
+            path=request.path[:255],
+            method=request.method,
+            url_name=(match.url_name or '') if match else '',
+            user=user,
+            status_code=response.status_code,
+            duration_ms=duration * 1000,
+            samples=profiler.samples,
+            folded_stacks=profiler.folded(),
+            queries=queries,
+        )
+        RequestProfile.trim(keep=settings.PROFILER_RING_SIZE)
+        response['X-Profile-Id'] = str(profile.id)
+        return response
@@ -65,3 +65,29 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.email} ({self.role})"
+
+
+class RequestProfile(models.Model):
+    """A sampled profile of one staff request, kept in a bounded ring buffer."""
+    path = models.CharField(max_length=255)
+    method = models.CharField(max_length=10)
+    url_name = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    folded_stacks = models.TextField(blank=True)  # Collapsed stack format for flame graphs
+    queries = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    @classmethod
+    def trim(cls, keep):
+        cutoff = list(cls.objects.order_by('-id').values_list('id', flat=True)[keep:keep + 1])
+        if cutoff:
+            cls.objects.filter(id__lte=cutoff[0]).delete()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from functools import wraps
+
+from django.http import JsonResponse
+from django_redis import get_redis_connection
+
+from educ_backend import metrics
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Sliding-window log over one sorted set per key. Every key is trimmed and counted,
+# and the attempt is recorded against all of them only if none is over the limit,
+# so the check and the increment happen atomically in one round trip.
+SLIDING_WINDOW = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local remaining = limit
+local retry_after = 0
+for _, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+    remaining = math.min(remaining, limit - count)
+end
+if retry_after > 0 then
+    return {0, 0, retry_after}
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+end
+return {1, remaining - 1, 0}
+"""
+
+_script = None
+
+
+def _sliding_window():
+    global _script
+    if _script is None:
+        _script = get_redis_connection('default').register_script(SLIDING_WINDOW)
+    return _script
+
+
+def parse_rate(rate):
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[-1]] * int(period[:-1] or 1)
+
+
+def json_field(name):
+    """Key function that limits on a field of the JSON request body."""
+    def key(request):
+        try:
+            value = json.loads(request.body).get(name)
+        except (ValueError, AttributeError):
+            return None
+        return str(value).strip().lower() if value else None
+    return key
+
+
+def rate_limit(scope, rate, target=None, methods=('POST',)):
+    """Limit a view per client IP and, when ``target`` yields a value, per target as well.
+
+    Both counters are checked and incremented by a single Redis script call.
+    Responses carry X-RateLimit-Limit and X-RateLimit-Remaining; refusals are
+    429s with Retry-After. When Redis is unavailable limiting is skipped entirely
+    (fail-open): the error is logged and the view runs without rate-limit headers.
+    """
+    limit, period = parse_rate(rate)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+
+            keys = [f"rl:{scope}:ip:{request.META.get('REMOTE_ADDR', '')}"]
+            target_value = target(request) if target else None
+            if target_value:
+                keys.append(f"rl:{scope}:target:{hashlib.sha256(target_value.encode()).hexdigest()}")
+            now_ms = int(time.time() * 1000)
+            try:
+                # The raw connection bypasses the instrumented cache client, so time it here.
+                with metrics.timed('cache_time'):
+                    allowed, remaining, retry_after = _sliding_window()(
+                        keys=keys, args=[now_ms, period * 1000, limit, f"{now_ms}:{uuid.uuid4().hex}"]
+                    )
+            except Exception as e:
+                # Fail open: an unavailable Redis should not lock everyone out of logging in.
+                logger.error(f"Rate limiter unavailable for {scope}: {e}")
+                return view(request, *args, **kwargs)
+
+            if not allowed:
+                response = JsonResponse({'error': 'Too many attempts, please try again later'}, status=429)
+                response['Retry-After'] = str(max(1, -(-int(retry_after) // 1000)))
+            else:
+                response = view(request, *args, **kwargs)
+            response['X-RateLimit-Limit'] = str(limit)
+            response['X-RateLimit-Remaining'] = str(remaining)
+            return response
+        return wrapped
+    return decorator
@@ -1,3 +1,138 @@
-from django.test import TestCase
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from accounts import ratelimit
+from educ_backend import routers
+
+User = get_user_model()
+
+try:
+    import fakeredis
+except ImportError:  # Optional: only these tests need it, and its Lua support (lupa)
+    fakeredis = None
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=self.server)
+        self.now = 1_700_000_000.0
+        for patcher in (
+            mock.patch.object(ratelimit, 'get_redis_connection', return_value=self.redis),
+            mock.patch.object(ratelimit, '_script', None),
+            mock.patch.object(ratelimit, 'time', mock.Mock(time=lambda: self.now)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.view = ratelimit.rate_limit('test', rate='3/m', target=ratelimit.json_field('email'))(
+            lambda request: HttpResponse('ok')
+        )
+
+    def post(self, email='a@example.com', address='10.0.0.1'):
+        request = RequestFactory().post(
+            '/', {'email': email}, content_type='application/json', REMOTE_ADDR=address
+        )
+        return self.view(request)
+
+    def test_allows_up_to_the_limit_then_refuses(self):
+        remaining = [self.post()['X-RateLimit-Remaining'] for _ in range(3)]
+        self.assertEqual(remaining, ['2', '1', '0'])
+        response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+
+    def test_refused_attempts_are_not_recorded(self):
+        for _ in range(5):
+            self.post()
+        self.assertEqual(self.redis.zcard('rl:test:ip:10.0.0.1'), 3)
+
+    def test_limits_each_target_across_addresses(self):
+        for index in range(3):
+            self.assertEqual(self.post(address=f'10.0.0.{index}').status_code, 200)
+        self.assertEqual(self.post(address='10.0.0.9').status_code, 429)
+        self.assertEqual(self.post(email='b@example.com', address='10.0.0.9').status_code, 200)
+
+    def test_window_slides(self):
+        self.post()
+        self.now += 30
+        self.post()
+        self.post()
+        self.assertEqual(self.post().status_code, 429)
+        # The first attempt has left the window, the other two are still in it.
+        self.now += 30.001
+        self.assertEqual(self.post()['X-RateLimit-Remaining'], '0')
+        self.assertEqual(self.post().status_code, 429)
+        self.now += 30
+        self.assertEqual(self.post().status_code, 200)
+
+    def test_fails_open_without_redis(self):
+        self.server.connected = False
+        with self.assertLogs(ratelimit.logger, 'ERROR'):
+            response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-RateLimit-Remaining', response)
+
+
+@override_settings(
+    REPLICA_DATABASES=['replica_1'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'router-tests'}},
+)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def routed_read(self, method='get', path='/api/assignments', write_first=False):
+        token = routers.begin_request(getattr(RequestFactory(), method)(path))
+        try:
+            if write_first:
+                self.assertEqual(self.router.db_for_write(User), 'default')
+            return self.router.db_for_read(User)
+        finally:
+            routers.end_request(token)
+
+    def test_safe_methods_read_from_a_replica(self):
+        self.assertEqual(self.routed_read('get'), 'replica_1')
+        self.assertEqual(self.routed_read('head'), 'replica_1')
+
+    def test_unsafe_methods_and_admin_stay_on_the_primary(self):
+        self.assertEqual(self.routed_read('post'), 'default')
+        self.assertEqual(self.routed_read('get', path='/admin/accounts/user/'), 'default')
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        self.assertEqual(self.routed_read(write_first=True), 'default')
+
+    def test_reads_inside_a_transaction_go_to_the_primary(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.routed_read(), 'default')
+
+    def test_no_request_means_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_use_primary_overrides_the_replica(self):
+        token = routers.begin_request(RequestFactory().get('/api/assignments'))
+        try:
+            routers.use_primary()
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        finally:
+            routers.end_request(token)
+
+    def test_pinning(self):
+        self.assertFalse(routers.is_pinned(42))
+        routers.pin_user(42)
+        self.assertTrue(routers.is_pinned(42))
+        self.assertFalse(routers.is_pinned(43))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_cache_calls_without_replicas(self):
+        with mock.patch.object(routers, 'cache') as cache:
+            routers.pin_user(42)
+            self.assertFalse(routers.is_pinned(42))
+        cache.set.assert_not_called()
+        cache.get.assert_not_called()
+        self.assertEqual(self.routed_read(), 'default')
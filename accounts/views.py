@@ -15,21 +15,18 @@ from django.utils.encoding import force_str, force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views.decorators.csrf import csrf_exempt
 from django.core.cache import cache
-from django_ratelimit.decorators import ratelimit
+from accounts.ratelimit import json_field, rate_limit
 from accounts.tasks import send_otp_email
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-@ratelimit(key='ip', rate='5/m', method='POST')
+@rate_limit('login', rate='5/m', target=json_field('email'))
 @csrf_exempt
 def login_view(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
-    if getattr(request, 'limited', False):
-        return JsonResponse({'error': 'Too many attempts, please try again later'}, status=429)
-
     try:
         data = json.loads(request.body)
         email = data.get('email')
@@ -64,14 +61,11 @@ def login_view(request):
 
 
 @csrf_exempt
-@ratelimit(key='ip', rate='5/m', method='POST')
+@rate_limit('verify_otp', rate='5/m', target=json_field('token'))
 def verify_otp(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
-    if getattr(request, 'limited', False):
-        return JsonResponse({'error': 'Too many attempts'}, status=429)
-
     try:
         data = json.loads(request.body)
         token = data.get('token')
@@ -97,7 +91,7 @@ def verify_otp(request):
     return JsonResponse({'token': new_token})
 
 @csrf_exempt
-@ratelimit(key='ip', rate='55/h', method='POST')  # Limit to 5 requests per hour per IP
+@rate_limit('password_reset', rate='55/h', target=json_field('uidb64'))
 def reset_password_view(request):
     if request.method != "POST":
         return JsonResponse({"error": "Method not allowed"}, status=405)
@@ -128,7 +122,7 @@ def reset_password_view(request):
 
 
 @csrf_exempt
-@ratelimit(key='ip', rate='5/h', method='POST')
+@rate_limit('request_reset', rate='5/h', target=json_field('email'))
 def request_reset_view(request):
     if request.method != "POST":
         return JsonResponse({"error": "Method not allowed"}, status=405)
@@ -1,7 +1,19 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'educ_backend.settings')
 app = Celery('educ_backend')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+app.conf.beat_schedule = {
+    'send-due-reminders': {
+        'task': 'academics.tasks.send_due_reminders',
+        'schedule': crontab(minute=0),  # Hourly; already-reminded pairs are skipped
+    },
+    'prune-tombstones': {
+        'task': 'academics.tasks.prune_tombstones',
+        'schedule': crontab(minute=30, hour=3),
+    },
+}
\ No newline at end of file
@@ -0,0 +1,146 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+_request_id = ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def begin_request(request):
+    # Honour an id assigned by the proxy so log lines can be joined with its access log.
+    request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+    return request_id, _request_id.set(request_id)
+
+
+def end_request(token):
+    _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Lets the first ``burst`` records per second from each call site through, then samples.
+
+    Only records below WARNING are sampled. The next record let through from a
+    throttled call site carries the number suppressed in between.
+    """
+
+    def __init__(self, burst=20, rate=0.01):
+        super().__init__()
+        self.burst = burst
+        self.rate = rate
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        second = int(time.time())
+        with self._lock:
+            window, seen, suppressed = self._windows.get(site, (second, 0, 0))
+            if window != second:
+                window, seen = second, 0
+            seen += 1
+            allowed = seen <= self.burst or random.random() < self.rate
+            if allowed and suppressed:
+                record.suppressed = suppressed
+            self._windows[site] = (window, seen, 0 if allowed else suppressed + 1)
+        return allowed
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class QueueStreamHandler(QueueHandler):
+    """Hands records to a bounded queue drained by a background thread that writes the stream.
+
+    Request threads never wait on stderr: when the queue is full the record is
+    dropped and counted instead. Formatting also happens on the listener thread.
+    """
+
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(queue_size))
+        self.queue_size = queue_size
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._start()
+        atexit.register(self.close)
+        # A forked worker (Celery prefork) inherits the queue but not the listener thread.
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart(self):
+        self.queue = queue.Queue(self.queue_size)
+        self.dropped = 0
+        self._start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve everything that depends on the caller's state before the record
+        # crosses threads, but leave the formatting to the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass  # Cannot hand the listener its stop sentinel; it dies with the process.
+        super().close()
+
+
+def dropped_records():
+    return sum(
+        handler.dropped for handler in logging.getLogger().handlers if isinstance(handler, QueueStreamHandler)
+    )
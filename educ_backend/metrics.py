@@ -0,0 +1,209 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django import http
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django_redis.client import DefaultClient
+
+from . import log
+
+_current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RequestMetrics:
+    """Timings collected while a single request is being served."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.jwt_time = 0.0
+        self.serialize_time = 0.0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self, total):
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits} hit {self.cache_misses} miss"',
+            f'jwt;dur={self.jwt_time * 1000:.1f}',
+            f'serialize;dur={self.serialize_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        return ', '.join(parts)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(attribute):
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            setattr(metrics, attribute, getattr(metrics, attribute) + time.perf_counter() - started)
+
+
+class InstrumentedRedisClient(DefaultClient):
+    """django_redis client that reports cache hits, misses and time to the current request."""
+
+    def get(self, key, default=None, version=None, client=None):
+        with timed('cache_time'):
+            value = super().get(key, default=default, version=version, client=client)
+        metrics = _current.get()
+        if metrics is not None:
+            if value is default:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        with timed('cache_time'):
+            values = super().get_many(keys, version=version, client=client)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += len(values)
+            metrics.cache_misses += len(keys) - len(values)
+        return values
+
+    def set(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().set_many(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().delete_many(*args, **kwargs)
+
+    # Rebuild locks, class version bumps and the rate limiter's script go through these.
+    def add(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().add(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().incr(*args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        with timed('cache_time'):
+            return super().decr(*args, **kwargs)
+
+
+def instrument_json_responses():
+    """Report the time every JsonResponse spends encoding as the ``serialize`` entry.
+
+    JsonResponse encodes in its constructor, before any middleware sees the response,
+    so the constructor itself is timed. Covers responses built anywhere, middleware
+    included, without views importing a look-alike class.
+    """
+    original = http.JsonResponse.__init__
+    if getattr(original, 'timed', False):
+        return
+
+    @wraps(original)
+    def __init__(self, *args, **kwargs):
+        with timed('serialize_time'):
+            original(self, *args, **kwargs)
+
+    __init__.timed = True
+    http.JsonResponse.__init__ = __init__
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            counts, total = self._series.get(label, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._series[label] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {label: (list(counts), total) for label, (counts, total) in self._series.items()}
+        for label, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{url_name="{label}",le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{url_name="{label}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{url_name="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{url_name="{label}"}} {cumulative}')
+        return lines
+
+
+# Per-process registry; each gunicorn worker exposes its own series.
+HISTOGRAMS = {
+    'total': Histogram('educ_request_duration_seconds', 'Time spent serving the request.', DURATION_BUCKETS),
+    'db_time': Histogram('educ_request_db_seconds', 'Time spent in SQL queries per request.', DURATION_BUCKETS),
+    'db_queries': Histogram('educ_request_db_queries', 'SQL queries issued per request.', COUNT_BUCKETS),
+    'cache_time': Histogram('educ_request_cache_seconds', 'Time spent in cache calls per request.', DURATION_BUCKETS),
+    'cache_misses': Histogram('educ_request_cache_misses', 'Cache misses per request.', COUNT_BUCKETS),
+    'jwt_time': Histogram('educ_request_jwt_seconds', 'Time spent verifying the JWT per request.', DURATION_BUCKETS),
+    'serialize_time': Histogram('educ_request_serialize_seconds', 'Time spent encoding JSON per request.', DURATION_BUCKETS),
+}
+
+
+def observe(url_name, metrics, total):
+    HISTOGRAMS['total'].observe(url_name, total)
+    HISTOGRAMS['db_time'].observe(url_name, metrics.db_time)
+    HISTOGRAMS['db_queries'].observe(url_name, metrics.db_queries)
+    HISTOGRAMS['cache_time'].observe(url_name, metrics.cache_time)
+    HISTOGRAMS['cache_misses'].observe(url_name, metrics.cache_misses)
+    HISTOGRAMS['jwt_time'].observe(url_name, metrics.jwt_time)
+    HISTOGRAMS['serialize_time'].observe(url_name, metrics.serialize_time)
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden("Metrics are only available locally")
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    lines.extend([
+        '# HELP educ_log_records_dropped_total Log records dropped because the log queue was full.',
+        '# TYPE educ_log_records_dropped_total counter',
+        f'educ_log_records_dropped_total {log.dropped_records()}',
+    ])
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
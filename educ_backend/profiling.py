@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack at a fixed interval from a helper thread.
+
+    Stacks are accumulated in the collapsed ``frame;frame;frame count`` format that
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class QueryCapture:
+    """execute_wrapper that keeps the SQL, parameters and timing of every query."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': self.alias,
+                'sql': sql,
+                'params': params if not many else None,
+                'time_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+    def explain(self, limit):
+        # Plans are fetched after the response is built so they don't skew the profile.
+        connection = connections[self.alias]
+        explained = set()
+        for query in self.queries:
+            sql = query['sql']
+            if len(explained) >= limit or sql in explained or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            explained.add(sql)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", query['params'])
+                    query['explain'] = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            except Exception as e:
+                query['explain'] = f"EXPLAIN failed: {e}"
+        for query in self.queries:
+            query['params'] = repr(query['params'])
+        return self.queries
@@ -0,0 +1,72 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# Routing state of the request being served: the replica chosen for its reads
+# (None means primary) and whether it has written anything yet.
+_state = ContextVar('db_routing', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def begin_request(request):
+    replica = None
+    if settings.REPLICA_DATABASES and request.method in SAFE_METHODS and not request.path.startswith('/admin/'):
+        replica = random.choice(settings.REPLICA_DATABASES)
+    return _state.set({'replica': replica, 'wrote': False})
+
+
+def end_request(token):
+    state = _state.get()
+    _state.reset(token)
+    return state['wrote']
+
+
+def use_primary():
+    state = _state.get()
+    if state is not None:
+        state['replica'] = None
+
+
+def _pin_key(user_id):
+    return f'db_pin_{user_id}'
+
+
+def pin_user(user_id):
+    # Read-your-writes: after a write, the user's reads stay on the primary until
+    # the replicas have had time to catch up. Without replicas there is nothing to
+    # pin, and a single-database deployment skips the cache call on every write.
+    if not settings.REPLICA_DATABASES:
+        return
+    cache.set(_pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    if not settings.REPLICA_DATABASES:
+        return False
+    return cache.get(_pin_key(user_id)) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['replica'] is None or state['wrote']:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return state['replica']
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -38,13 +38,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.PerformanceMetricsMiddleware',
+    'accounts.middleware.RequestIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.ReplicaRoutingMiddleware',
     "accounts.middleware.SimpleJWTMiddleware",
+    'accounts.middleware.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +102,20 @@ USE_I18N = True
 
 USE_TZ = True
 
+ACADEMIC_YEAR_START_MONTH = 1  # Month the school year begins; see academics.archive
+
+# Calendar windows (academics.views.calendar_events_view)
+CALENDAR_DEFAULT_DAYS = 365  # Window reaches this far either side of today when none is given
+CALENDAR_MAX_WINDOW_DAYS = 800
+HOME_UPCOMING_EVENT_DAYS = 14  # Events shown on the home dashboard
+RECURRENCE_MAX_OCCURRENCES = 1000  # Longest bounded series an event may define
+
+# Delta sync (academics.sync)
+SYNC_TOMBSTONE_DAYS = 30  # Deletions are remembered this long; older cursors get a full resync
+SYNC_CURSOR_OVERLAP_SECONDS = 5  # Each sync window reaches this far back to catch late commits
+
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per server-side cursor round trip in grade exports
+
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -124,6 +142,23 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://u:p@replica1/db,postgres://u:p@replica2/db
+REPLICA_DATABASES = []
+for index, replica_url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    replica = urlparse(replica_url.strip())
+    DATABASES[f'replica_{index}'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': replica.path[1:],
+        'USER': replica.username,
+        'PASSWORD': replica.password,
+        'HOST': replica.hostname,
+        'PORT': replica.port or 5432,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica_{index}')
+DATABASE_ROUTERS = ['educ_backend.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10  # Reads stay on the primary this long after a user writes
+
 # Secret key for JWT (ensure this is secure in production)
 SECRET_KEY = os.getenv('SECRET_KEY')
 
@@ -142,12 +177,26 @@ CACHES = {
         'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': 'redis://127.0.0.1:6379/1',
         'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CLIENT_CLASS': 'educ_backend.metrics.InstrumentedRedisClient',
         }
     }
 }
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 
+# Stampede protection for shared payloads (academics.caching)
+CACHE_STALE_SECONDS = 300  # How long an expired payload may still be served while it is rebuilt
+CACHE_REBUILD_LOCK_SECONDS = 30
+CACHE_REBUILD_WAIT_SECONDS = 2  # Cold misses wait this long for another worker's rebuild
+CACHE_EARLY_EXPIRY_BETA = 1.0  # >1 refreshes earlier, 0 disables early expiry
+
+# Addresses allowed to scrape /metrics
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# On-demand request profiling (accounts.middleware.RequestProfilerMiddleware)
+PROFILER_SAMPLE_INTERVAL = 0.002  # Seconds between stack samples
+PROFILER_MAX_EXPLAINS = 20  # Distinct SELECTs explained per profile
+PROFILER_RING_SIZE = 50  # Profiles kept before the oldest are dropped
+
 # Celery settings
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'  # Redis as message broker
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
@@ -155,13 +204,62 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Previews render on their own queue so a small pool bounds poppler's CPU use:
+#   celery -A educ_backend worker -Q previews -c 2
+CELERY_TASK_ROUTES = {
+    'academics.tasks.generate_submission_preview': {'queue': 'previews'},
+    'academics.tasks.detect_similar_submissions': {'queue': 'previews'},
+}
+PDF_RENDER_CONCURRENCY = 2  # Renders at once per worker process
+PDF_RENDER_TIMEOUT = 30  # Seconds
+PDF_THUMBNAIL_SIZE = 320  # Pixels on the longer side
+
+# Near-duplicate detection (academics.similarity). 16 bands of 8 rows put the LSH
+# threshold around 0.7; pairs found are then checked against SIMILARITY_THRESHOLD.
+SIMILARITY_NUM_PERM = 128
+SIMILARITY_BANDS = 16
+SIMILARITY_SHINGLE_WORDS = 5
+SIMILARITY_MIN_SHINGLES = 20  # Shorter texts are too small to compare meaningfully
+SIMILARITY_THRESHOLD = 0.8
+SIMILARITY_MAX_PAGES = 50  # Pages of text extracted per submission
+
+# Due-date reminders (academics.tasks.send_due_reminders)
+DUE_REMINDER_WINDOW_HOURS = int(os.getenv('DUE_REMINDER_WINDOW_HOURS', 24))
+DUE_REMINDER_BATCH_SIZE = 100  # Students per email batch
+DUE_REMINDER_BATCH_INTERVAL = 10  # Seconds between batches
+
+
+# Records go through a bounded queue to a background writer thread as JSON lines.
+# Chatty INFO/DEBUG call sites are throttled to LOG_SAMPLE_BURST records per second,
+# then sampled at LOG_SAMPLE_RATE; warnings and errors always get through.
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '20'))
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.01'))
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {
+            '()': 'educ_backend.log.RequestIdFilter',
+        },
+        'sampling': {
+            '()': 'educ_backend.log.SamplingFilter',
+            'burst': LOG_SAMPLE_BURST,
+            'rate': LOG_SAMPLE_RATE,
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'educ_backend.log.JsonFormatter',
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'educ_backend.log.QueueStreamHandler',
+            'queue_size': LOG_QUEUE_SIZE,
+            'formatter': 'json',
+            'filters': ['sampling', 'request_id'],
         },
     },
     'loggers': {